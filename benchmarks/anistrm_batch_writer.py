@@ -0,0 +1,75 @@
+"""
+ANiStrm strm 写入基准：逐个直接写入 vs StrmBatchWriter 批量写入（可选 fsync）
+
+需要在 MoviePilot 后端环境中运行（插件依赖 app.*），例如：
+    PYTHONPATH=/path/to/MoviePilot python benchmarks/anistrm_batch_writer.py --counts 1000,5000,10000
+
+--dir 指定测试目录所在位置（默认系统临时目录），建议指向实际的 strm 存储盘
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "plugins"))
+
+from anistrm import StrmFileService  # noqa: E402
+
+BASE_URL = "https://openani.an-i.workers.dev"
+SEASON = "2024-10"
+
+
+def build_names(count: int):
+    return [f"[ANi] Bench {i // 12:04d} - {i % 12 + 1:02d} [1080P][Baha][WEB-DL][AAC AVC][CHT].mp4" for i in range(count)]
+
+
+def per_file(root: Path, names, fsync: bool) -> float:
+    started = time.perf_counter()
+    for name in names:
+        path = root / f"{name}.strm"
+        with open(path, "w", encoding="utf-8") as strm_file:
+            strm_file.write(StrmFileService.build_season_url(SEASON, name, BASE_URL))
+            if fsync:
+                strm_file.flush()
+                os.fsync(strm_file.fileno())
+    return time.perf_counter() - started
+
+
+def batched(root: Path, names, batch_size: int, fsync: bool) -> float:
+    service = StrmFileService(batch_size=batch_size, fsync=fsync)
+    started = time.perf_counter()
+    result = service.touch_many(str(root), SEASON, names, base_url=BASE_URL)
+    elapsed = time.perf_counter() - started
+    assert result["created"] == len(names), result
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--counts", default="1000,5000,10000", help="strm数量，逗号分隔")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--fsync", action="store_true", help="两种方式都开启fsync")
+    parser.add_argument("--dir", default=None, help="测试目录所在位置")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数，取最快一次")
+    args = parser.parse_args()
+
+    print(f"{'count':>7} {'per-file':>10} {'batched':>10} {'speedup':>8}")
+    for count in (int(value) for value in args.counts.split(",")):
+        names = build_names(count)
+        direct = batch = float("inf")
+        for _ in range(max(1, args.repeat)):
+            workdir = Path(tempfile.mkdtemp(prefix="anistrm-bench-", dir=args.dir))
+            try:
+                (workdir / "direct").mkdir()
+                direct = min(direct, per_file(workdir / "direct", names, args.fsync))
+                batch = min(batch, batched(workdir / "batched", names, args.batch_size, args.fsync))
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+        print(f"{count:>7} {direct:>9.3f}s {batch:>9.3f}s {direct / batch:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
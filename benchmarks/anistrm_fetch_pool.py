@@ -0,0 +1,60 @@
+"""
+ANiStrm 多季度并发拉取基准：对本地桩服务按不同并发数拉取多个季度目录，比较总耗时
+
+需要在 MoviePilot 后端环境中运行（插件依赖 app.*），例如：
+    PYTHONPATH=/path/to/MoviePilot python benchmarks/anistrm_fetch_pool.py --seasons 12 --latency 0.3
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "plugins"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from anistrm import AniStrmClient  # noqa: E402
+from stub_openani import StubOpenAni  # noqa: E402
+
+
+def build_seasons(count: int):
+    seasons = []
+    year, month = 2024, 10
+    for _ in range(count):
+        seasons.append(f"{year}-{month}")
+        month -= 3
+        if month < 1:
+            year, month = year - 1, month + 12
+    return seasons
+
+
+def fetch_all(base_url: str, seasons, workers: int):
+    # 关闭响应缓存，每次都真正请求桩服务
+    client = AniStrmClient(proxy_base=base_url, cache_ttl=0)
+    started = time.perf_counter()
+    total = 0
+    for season, files in client.iter_season_files(seasons, max_workers=workers):
+        total += sum(1 for _ in files)
+    return time.perf_counter() - started, total, client.retry_policy.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seasons", type=int, default=12, help="季度数量")
+    parser.add_argument("--files", type=int, default=200, help="每个季度的文件数")
+    parser.add_argument("--latency", type=float, default=0.3, help="桩服务每次响应的延迟（秒）")
+    parser.add_argument("--workers", default="1,2,4,8", help="并发数，逗号分隔")
+    args = parser.parse_args()
+
+    seasons = build_seasons(args.seasons)
+    with StubOpenAni(seasons, files_per_season=args.files, latency=args.latency) as stub:
+        print(f"stub={stub.url} seasons={len(seasons)} files/season={args.files} latency={args.latency}s")
+        print(f"{'workers':>7} {'wall':>8} {'files':>7} {'speedup':>8}  retry stats")
+        baseline = None
+        for workers in (int(value) for value in args.workers.split(",")):
+            elapsed, total, stats = fetch_all(stub.url, seasons, workers)
+            baseline = baseline or elapsed
+            print(f"{workers:>7} {elapsed:>7.2f}s {total:>7} {baseline / elapsed:>7.2f}x  {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+ANiStrm 多镜像故障切换基准：启动两个本地桩镜像（A 较快、B 较慢），
+分别测量正常、A 返回 502、A 停止服务时读取一个季度目录的耗时，以及切换后下一次请求的耗时
+
+需要在 MoviePilot 后端环境中运行（插件依赖 app.*），例如：
+    PYTHONPATH=/path/to/MoviePilot python benchmarks/anistrm_mirror_failover.py
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "plugins"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from anistrm import AniStrmClient  # noqa: E402
+from stub_openani import StubOpenAni  # noqa: E402
+
+SEASON = "2024-10"
+
+
+def timed_fetch(client: AniStrmClient):
+    started = time.perf_counter()
+    names = client.get_season_list(SEASON)
+    return time.perf_counter() - started, len(names)
+
+
+def run_scenario(title: str, fast: StubOpenAni, slow: StubOpenAni, fail_fast=None):
+    """
+    :param fail_fast: 探测完成后对镜像 A 施加的故障：None 正常；"502" 返回 502；"down" 停止服务
+    """
+    client = AniStrmClient(proxy_base=f"{fast.url},{slow.url}", cache_ttl=0)
+    client.probe_mirrors()
+    if fail_fast == "502":
+        fast.fail_status = 502
+    elif fail_fast == "down":
+        fast.stop()
+    try:
+        first, count = timed_fetch(client)
+        second, _ = timed_fetch(client)
+    finally:
+        fast.fail_status = None
+    print(
+        f"{title:<14} 首次={first:>6.2f}s 再次={second:>6.2f}s 文件数={count:>4} "
+        f"重试={client.retry_policy.stats} 可用={[item['healthy'] for item in client.mirror_snapshot()]}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fast-latency", type=float, default=0.02, help="镜像A响应延迟（秒）")
+    parser.add_argument("--slow-latency", type=float, default=0.15, help="镜像B响应延迟（秒）")
+    parser.add_argument("--files", type=int, default=200, help="季度文件数")
+    args = parser.parse_args()
+
+    with StubOpenAni([SEASON], args.files, args.slow_latency) as slow:
+        with StubOpenAni([SEASON], args.files, args.fast_latency) as fast:
+            run_scenario("正常", fast, slow)
+            run_scenario("A返回502", fast, slow, fail_fast="502")
+        # 最后一个场景会停止镜像A
+        fast = StubOpenAni([SEASON], args.files, args.fast_latency).start()
+        run_scenario("A停止服务", fast, slow, fail_fast="down")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+ANiStrm 跳过为主的稳态基准：季度内所有 strm 均已存在时，
+比较逐个拼接链接并检查文件是否存在（旧流程）与 StrmFileService.touch_many（先查目录索引、只为需写入的文件拼接链接）
+
+需要在 MoviePilot 后端环境中运行（插件依赖 app.*），例如：
+    PYTHONPATH=/path/to/MoviePilot python benchmarks/anistrm_touch_many.py --count 5000
+"""
+import argparse
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "plugins"))
+
+from anistrm import StrmFileService  # noqa: E402
+
+BASE_URL = "https://openani.an-i.workers.dev"
+SEASON = "2024-10"
+
+
+def build_names(count: int):
+    return [f"[ANi] Bench {i // 12:04d} - {i % 12 + 1:02d} [1080P][Baha][WEB-DL][AAC AVC][CHT].mp4" for i in range(count)]
+
+
+def per_name(root: Path, names) -> float:
+    started = time.perf_counter()
+    skipped = 0
+    for name in names:
+        StrmFileService.build_season_url(SEASON, name, BASE_URL)
+        if (root / f"{name}.strm").exists():
+            skipped += 1
+    elapsed = time.perf_counter() - started
+    assert skipped == len(names), skipped
+    return elapsed
+
+
+def touch_many(root: Path, names, service: StrmFileService) -> float:
+    started = time.perf_counter()
+    result = service.touch_many(str(root), SEASON, names, base_url=BASE_URL)
+    elapsed = time.perf_counter() - started
+    assert result["exists"] == len(names), result
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=5000, help="季度内文件数")
+    parser.add_argument("--dir", default=None, help="测试目录所在位置")
+    parser.add_argument("--repeat", type=int, default=7, help="重复次数，取中位数")
+    args = parser.parse_args()
+
+    names = build_names(args.count)
+    workdir = Path(tempfile.mkdtemp(prefix="anistrm-bench-", dir=args.dir))
+    try:
+        # 先写一遍，之后每轮都是全部跳过的稳态
+        created = StrmFileService().touch_many(str(workdir), SEASON, names, base_url=BASE_URL)
+        assert created["created"] == len(names), created
+        warm_service = StrmFileService()
+        warm_service.touch_many(str(workdir), SEASON, names, base_url=BASE_URL)
+
+        timings = {"per-name": [], "touch_many": [], "touch_many(warm)": []}
+        for _ in range(max(1, args.repeat)):
+            timings["per-name"].append(per_name(workdir, names))
+            # 插件每次任务开始都会重置索引，冷索引即包含一次目录扫描
+            timings["touch_many"].append(touch_many(workdir, names, StrmFileService()))
+            timings["touch_many(warm)"].append(touch_many(workdir, names, warm_service))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    baseline = statistics.median(timings["per-name"])
+    print(f"count={args.count} repeat={args.repeat}")
+    print(f"{'mode':<18} {'median':>9} {'per name':>10} {'speedup':>8}")
+    for mode, values in timings.items():
+        median = statistics.median(values)
+        print(f"{mode:<18} {median * 1000:>7.1f}ms {median / args.count * 1e6:>8.2f}us {baseline / median:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+基准测试用的本地 openani 目录服务桩：POST / 返回季度文件夹列表，POST /<季度>/ 返回该季度文件列表，
+可设置响应延迟与故障状态码
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+
+class StubOpenAni:
+    def __init__(self, seasons: List[str], files_per_season: int = 100, latency: float = 0.0):
+        self.seasons = seasons
+        self.files_per_season = files_per_season
+        self.latency = latency
+        # 非 None 时所有请求直接返回该状态码
+        self.fail_status: Optional[int] = None
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubOpenAni":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StubOpenAni":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def payload(self, path: str) -> dict:
+        season = path.strip("/")
+        if not season:
+            return {
+                "files": [
+                    {"name": name, "mimeType": "application/vnd.google-apps.folder", "modifiedTime": "2024-01-01T00:00:00Z"}
+                    for name in self.seasons
+                ],
+                "nextPageToken": None,
+            }
+        return {
+            "files": [
+                {
+                    "name": f"[ANi] Stub {season} {i // 12:03d} - {i % 12 + 1:02d} [1080P][Baha][WEB-DL][AAC AVC][CHT].mp4",
+                    "mimeType": "video/mp4",
+                    "modifiedTime": "2024-01-01T00:00:00Z",
+                    "size": "1073741824",
+                }
+                for i in range(self.files_per_season)
+            ],
+            "nextPageToken": None,
+        }
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    self.rfile.read(length)
+                with stub._lock:
+                    stub.requests += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+                if stub.fail_status:
+                    self.send_response(stub.fail_status)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body = json.dumps(stub.payload(self.path)).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -1,7 +1,20 @@
+import codecs
+import errno
+import hashlib
+import itertools
+import json
+import os
+import random
+import re
+import shutil
+import threading
 import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 from urllib.parse import quote, urlparse, urlunparse
 
 import pytz
@@ -18,13 +31,19 @@ class ANiStrm(_PluginBase):
     plugin_name = "ANiStrm"
     plugin_desc = "自动获取当季所有番剧，免去下载，轻松拥有一个番剧媒体库"
     plugin_icon = "https://raw.githubusercontent.com/honue/MoviePilot-Plugins/main/icons/anistrm.png"
-    plugin_version = "2.5.0"
+    plugin_version = "2.5.15"
     plugin_author = "honue"
     author_url = "https://github.com/honue"
     plugin_config_prefix = "anistrm_"
     plugin_order = 15
     auth_level = 2
 
+    # 保留最近多少次运行的指标
+    METRICS_HISTORY_SIZE = 20
+    # 单次清理超过上次清单的该比例（且至少若干个）时视为目录异常，跳过清理
+    RECONCILE_MAX_RATIO = 0.5
+    RECONCILE_GUARD_MIN = 3
+
     _enabled = False
     _use_proxy = True
     _cron = None
@@ -32,12 +51,27 @@ class ANiStrm(_PluginBase):
     _storageplace = None
     _selected_seasons: List[str] = []
     _proxy_base = None
+    _max_workers = 4
+    _incremental = True
+    _write_batch_size = 200
+    _fsync = False
+    _streaming = False
+    _prefetch_pages = True
+    _spread_mirrors = False
+    _reconcile_mode = "off"
+    _layout = "flat"
+    _migrate_layout = False
+    _adaptive_schedule = False
+    _adaptive_idle_hours = 6
     _scheduler: Optional[BackgroundScheduler] = None
 
     def __init__(self):
         super().__init__()
         self._client = AniStrmClient()
         self._strm_service = StrmFileService()
+        self._manifest_store = SeasonManifestStore(self)
+        self._task_lock = threading.Lock()
+        self._metrics = self._client.metrics
 
     def init_plugin(self, config: dict = None):
         self.stop_service()
@@ -54,21 +88,49 @@ class ANiStrm(_PluginBase):
         else:
             self._selected_seasons = ["latest"]
         self._proxy_base = config.get("proxy_base") or "https://openani.an-i.workers.dev"
+        self._max_workers = self.__parse_positive_int(config.get("max_workers"), default=4)
+        incremental = config.get("incremental")
+        self._incremental = True if incremental is None else incremental
+        self._write_batch_size = self.__parse_positive_int(config.get("write_batch_size"), default=200)
+        self._fsync = config.get("fsync", False)
+        self._streaming = config.get("streaming", False)
+        prefetch_pages = config.get("prefetch_pages")
+        self._prefetch_pages = True if prefetch_pages is None else prefetch_pages
+        self._client.set_prefetch_pages(self._prefetch_pages)
+        self._spread_mirrors = config.get("spread_mirrors", False)
+        self._reconcile_mode = config.get("reconcile_mode") or "off"
+        self._layout = StrmLayout(config.get("layout") or StrmLayout.FLAT).mode
+        self._migrate_layout = config.get("migrate_layout", False)
+        self._adaptive_schedule = config.get("adaptive_schedule", False)
+        self._adaptive_idle_hours = self.__parse_positive_int(config.get("adaptive_idle_hours"), default=6)
+        self._adaptive = AdaptiveSchedule(self, settings.TZ, idle_interval=timedelta(hours=self._adaptive_idle_hours))
+        self._strm_service.set_layout(StrmLayout(self._layout))
+        self._strm_service.set_write_options(batch_size=self._write_batch_size, fsync=self._fsync)
         self._client.set_use_proxy(self._use_proxy)
         self._client.set_proxy_base(self._proxy_base)
+        self._client.set_cache_dir(self.get_data_path() / "cache")
         logger.info(
             f"ANi-Strm配置加载：enabled={self._enabled}, onlyonce={self._onlyonce}, "
             f"use_proxy={self._use_proxy}, proxy_base={self._proxy_base}, "
-            f"seasons={self._selected_seasons or []}, storage={self._storageplace}"
+            f"seasons={self._selected_seasons or []}, storage={self._storageplace}, "
+            f"max_workers={self._max_workers}, incremental={self._incremental}, "
+            f"write_batch_size={self._write_batch_size}, fsync={self._fsync}, streaming={self._streaming}, "
+            f"prefetch_pages={self._prefetch_pages}, spread_mirrors={self._spread_mirrors}, "
+            f"reconcile_mode={self._reconcile_mode}, layout={self._layout}, "
+            f"adaptive_schedule={self._adaptive_schedule}, adaptive_idle_hours={self._adaptive_idle_hours}"
         )
 
-        if not (self._enabled or self._onlyonce):
+        if not (self._enabled or self._onlyonce or self._migrate_layout):
             logger.info("ANi-Strm未启用且未触发立即运行，跳过任务注册")
             return
 
         self._scheduler = BackgroundScheduler(timezone=settings.TZ)
 
-        if self._enabled and self._cron:
+        if self._enabled and self._adaptive_schedule:
+            self.__schedule_adaptive(
+                [self._adaptive.local_season() if season == "latest" else season for season in self._selected_seasons]
+            )
+        elif self._enabled and self._cron:
             try:
                 self._scheduler.add_job(
                     func=self.__task,
@@ -79,6 +141,16 @@ class ANiStrm(_PluginBase):
             except Exception as err:
                 logger.error(f"定时任务配置错误：{err}")
 
+        if self._migrate_layout:
+            logger.info(f"ANi-Strm将按布局 {self._layout} 迁移已有strm文件")
+            self._scheduler.add_job(
+                func=self.__migrate_layout,
+                trigger="date",
+                run_date=datetime.now(tz=pytz.timezone(settings.TZ)) + timedelta(seconds=1),
+                name="ANiStrm目录迁移",
+            )
+            self._migrate_layout = False
+
         if self._onlyonce:
             logger.info("ANi-Strm服务启动，立即运行一次")
             self._scheduler.add_job(
@@ -95,57 +167,221 @@ class ANiStrm(_PluginBase):
             self._scheduler.print_jobs()
             self._scheduler.start()
 
+    def __migrate_layout(self):
+        with self._task_lock:
+            self.__apply_layout()
+
+    def __ensure_layout(self):
+        """
+        布局或存储目录与上次迁移时不同，先迁移已有strm，避免按新布局重写一份
+        """
+        state = self.get_data("layout_state") or {}
+        if state.get("storage") == self._storageplace and state.get("layout") == self._layout:
+            return
+        self.__apply_layout()
+
+    def __apply_layout(self):
+        logger.info(f"ANi-Strm开始迁移目录布局：storage={self._storageplace}, layout={self._layout}")
+        try:
+            result = self._strm_service.migrate_layout(self._storageplace)
+        except OSError as err:
+            logger.error(f"ANi-Strm目录迁移失败：{err}")
+            return
+        logger.info(
+            f"ANi-Strm目录迁移完成：移动={result['moved']}，删除重复={result['duplicates']}，"
+            f"跳过={result['skipped']}，失败={result['failed']}"
+        )
+        if not result["failed"]:
+            self.save_data("layout_state", {"storage": self._storageplace, "layout": self._layout})
+
     def __task(self):
+        seasons: List[str] = []
+        try:
+            with self._task_lock:
+                seasons = self.__run_task()
+        finally:
+            # 任务异常时也要登记下一次检查，否则自适应调度链会中断
+            if self._enabled and self._adaptive_schedule and self._scheduler:
+                self.__schedule_adaptive(seasons)
+
+    def __schedule_adaptive(self, seasons: List[str]):
+        run_date = self._adaptive.next_run(seasons)
+        self._scheduler.add_job(
+            func=self.__task,
+            trigger="date",
+            run_date=run_date,
+            id="anistrm_adaptive",
+            replace_existing=True,
+            name="ANiStrm自适应检查",
+        )
+        logger.info(f"ANi-Strm下次自适应检查：{run_date.strftime('%Y-%m-%d %H:%M:%S')}，季度={seasons}")
+
+    def __run_task(self) -> List[str]:
+        self.__ensure_layout()
+        self._strm_service.reset_index()
+        self._client.retry_policy.reset_stats()
+        self._client.reset_listing_status()
+        self._metrics.start_run()
+        self._client.probe_mirrors()
+
         seasons = self.__get_target_seasons()
         if not seasons:
             logger.info("未选择任何季度，任务结束")
-            return
+            return seasons
 
         logger.info(
             f"ANi-Strm任务开始：seasons={seasons}, storage={self._storageplace}, "
             f"proxy={self._client._get_openani_base()}, use_proxy={self._use_proxy}"
         )
-
         total_files = 0
         total_created = 0
         total_exists = 0
         total_failed = 0
+        total_pruned = 0
 
-        for season in seasons:
-            file_names = self._client.get_season_list(season)
-            season_total = len(file_names)
-            season_created = 0
-            season_exists = 0
-            season_failed = 0
-            logger.info(f"ANi-Strm开始处理季度：{season}，文件数={season_total}")
-            for file_name in file_names:
-                status = self._strm_service.touch_strm_file(
-                    storage_path=self._storageplace,
-                    file_name=file_name,
-                    season=season,
-                    base_url=self._client._get_openani_base(),
-                )
-                if status == "created":
-                    season_created += 1
-                elif status == "exists":
-                    season_exists += 1
-                else:
-                    season_failed += 1
+        if self._streaming:
+            season_files = ((season, self._client.iter_season_files_stream(season)) for season in seasons)
+        else:
+            season_files = self._client.iter_season_files(seasons, max_workers=self._max_workers)
 
-            total_files += season_total
-            total_created += season_created
-            total_exists += season_exists
-            total_failed += season_failed
-            logger.info(
-                f"ANi-Strm季度处理完成：{season}，总数={season_total}，"
-                f"新增={season_created}，跳过={season_exists}，失败={season_failed}"
-            )
+        # 本次运行内所有季度共用同一个链接前缀
+        base_url = self._client._get_openani_base()
+        spread_urls = self._client.mirrors if self._spread_mirrors else None
+        season_started = time.monotonic()
+        for season, files in season_files:
+            stats = self.__process_season(season, files, base_url=base_url, spread_urls=spread_urls)
+            self._metrics.record_season(season, stats, duration=time.monotonic() - season_started)
+            season_started = time.monotonic()
+            total_files += stats["total"]
+            total_created += stats["created"]
+            total_exists += stats["exists"]
+            total_failed += stats["failed"]
+            total_pruned += stats["pruned"]
 
+        request_stats = self._client.retry_policy.stats
         logger.info(
             f"ANi-Strm任务完成：季度数={len(seasons)}，文件总数={total_files}，"
-            f"新增={total_created}，跳过={total_exists}，失败={total_failed}"
+            f"新增={total_created}，跳过={total_exists}，失败={total_failed}，清理={total_pruned}，"
+            f"请求重试={request_stats['retries']}，请求失败={request_stats['failures']}，"
+            f"熔断跳过={request_stats['short_circuits']}"
+        )
+        self.__save_run_metrics(self._metrics.finish_run(request_stats, self._client.mirror_snapshot()))
+        return seasons
+
+    def __save_run_metrics(self, run: Dict[str, Any]):
+        history = self.get_data("run_metrics") or []
+        history.append(run)
+        self.save_data("run_metrics", history[-self.METRICS_HISTORY_SIZE:])
+        logger.info(
+            f"ANi-Strm运行耗时：{run['wall_time']}s，目录请求={run['requests']}，下载={run['bytes']}字节"
         )
 
+    def __process_season(
+        self,
+        season: str,
+        files: Iterable[Dict[str, Any]],
+        base_url: str,
+        spread_urls: Optional[List[str]] = None,
+    ) -> Dict[str, int]:
+        logger.info(f"ANi-Strm开始处理季度：{season}")
+        previous = self._manifest_store.load(season, storage_path=self._storageplace, layout=self._layout)
+        manifest = previous if self._incremental else {}
+        current: Dict[str, List[Any]] = {}
+        pending_count = 0
+
+        def pending_names() -> Iterator[str]:
+            nonlocal pending_count
+            for file_info in files:
+                name = file_info["name"]
+                if name in current:
+                    continue
+                entry = SeasonManifestStore.build_entry(file_info)
+                current[name] = entry
+                if manifest.get(name) != entry:
+                    pending_count += 1
+                    yield name
+
+        result = self._strm_service.touch_many(
+            storage_path=self._storageplace,
+            season=season,
+            names=pending_names(),
+            base_url=base_url,
+            spread_urls=spread_urls,
+        )
+        listed_total = len(current)
+        complete = self._client.is_listing_complete(season)
+        if complete and self._reconcile_mode != "off" and not self.__is_safe_to_prune(season, previous, current):
+            complete = False
+        pruned = 0
+        unpruned: List[str] = []
+        if complete and self._reconcile_mode != "off":
+            pruned, unpruned = self.__reconcile_season(season, previous, current)
+
+        for file_name in result["failed_names"]:
+            current.pop(file_name, None)
+        for file_name in unpruned:
+            # 预览或清理失败的条目留在清单中，之后切换模式或重试时仍能清理
+            current[file_name] = previous[file_name]
+        if not complete:
+            # 目录未完整读取时保留旧清单中未见到的条目，避免误判为上游删除
+            current = {**previous, **current}
+        if current:
+            self._manifest_store.save(season, current, storage_path=self._storageplace, layout=self._layout)
+        self._adaptive.record(season, [entry[0] for name, entry in current.items() if name not in previous])
+
+        stats = {
+            "total": listed_total,
+            "created": result["created"],
+            "exists": result["exists"] + listed_total - pending_count,
+            "failed": result["failed"],
+            "pruned": pruned,
+        }
+        logger.info(
+            f"ANi-Strm季度处理完成：{season}，总数={stats['total']}，待检查={pending_count}，"
+            f"新增={stats['created']}，跳过={stats['exists']}，失败={stats['failed']}，清理={stats['pruned']}"
+        )
+        return stats
+
+    def __is_safe_to_prune(
+        self, season: str, previous: Dict[str, List[Any]], current: Dict[str, List[Any]]
+    ) -> bool:
+        removed = sum(1 for name in previous if name not in current)
+        if removed >= self.RECONCILE_GUARD_MIN and removed > len(previous) * self.RECONCILE_MAX_RATIO:
+            logger.warning(
+                f"ANi-Strm清理已跳过：{season}，本次将移除{removed}/{len(previous)}个，"
+                f"超过{int(self.RECONCILE_MAX_RATIO * 100)}%，可能是目录返回异常"
+            )
+            return False
+        return True
+
+    def __reconcile_season(
+        self, season: str, previous: Dict[str, List[Any]], current: Dict[str, List[Any]]
+    ) -> Tuple[int, List[str]]:
+        """
+        对比上次清单与本次完整目录，处理上游已改名或删除的strm文件
+        :return: 已清理数量，以及本地仍存在、未清理的文件名
+        """
+        removed = [name for name in previous if name not in current]
+        if not removed:
+            return 0, []
+        result = self._strm_service.remove_many(
+            storage_path=self._storageplace,
+            season=season,
+            names=removed,
+            mode=self._reconcile_mode,
+        )
+        if self._reconcile_mode == "dry_run":
+            logger.info(
+                f"ANi-Strm清理预览：{season}，上游已移除{len(removed)}个，"
+                f"本地待清理{len(result['matched'])}个：{result['matched']}"
+            )
+            return 0, result["kept"]
+        logger.info(
+            f"ANi-Strm清理完成：{season}，上游已移除{len(removed)}个，"
+            f"已{'隔离' if self._reconcile_mode == 'quarantine' else '删除'}{result['removed']}个，失败{result['failed']}个"
+        )
+        return result["removed"], result["kept"]
+
     def __get_target_seasons(self) -> List[str]:
         if self._selected_seasons:
             seasons: List[str] = []
@@ -159,6 +395,14 @@ class ANiStrm(_PluginBase):
             return list(dict.fromkeys(seasons))
         return []
 
+    @staticmethod
+    def __parse_positive_int(value: Any, default: int) -> int:
+        try:
+            parsed = int(value)
+        except (TypeError, ValueError):
+            return default
+        return parsed if parsed > 0 else default
+
     def get_current_season_list(self) -> List[str]:
         return self._client.get_current_season_list()
 
@@ -170,7 +414,23 @@ class ANiStrm(_PluginBase):
         pass
 
     def get_api(self) -> List[Dict[str, Any]]:
-        pass
+        return [
+            {
+                "path": "/metrics",
+                "endpoint": self.get_metrics,
+                "methods": ["GET"],
+                "auth": "apikey",
+                "summary": "ANiStrm运行指标",
+                "description": "返回最近几次运行的季度耗时、请求重试、下载字节数与文件处理结果",
+            }
+        ]
+
+    def get_metrics(self) -> Dict[str, Any]:
+        history = self.get_data("run_metrics") or []
+        return {
+            "runs": list(reversed(history)),
+            "mirrors": self._client.mirror_snapshot(),
+        }
 
     def get_form(self) -> Tuple[List[dict], Dict[str, Any]]:
         season_options = self.__build_season_options()
@@ -185,7 +445,7 @@ class ANiStrm(_PluginBase):
                                 "component": "VCol",
                                 "props": {
                                     "cols": 12,
-                                    "md": 4,
+                                    "md": 3,
                                 },
                                 "content": [
                                     {
@@ -201,7 +461,7 @@ class ANiStrm(_PluginBase):
                                 "component": "VCol",
                                 "props": {
                                     "cols": 12,
-                                    "md": 4,
+                                    "md": 3,
                                 },
                                 "content": [
                                     {
@@ -217,7 +477,7 @@ class ANiStrm(_PluginBase):
                                 "component": "VCol",
                                 "props": {
                                     "cols": 12,
-                                    "md": 4,
+                                    "md": 3,
                                 },
                                 "content": [
                                     {
@@ -229,6 +489,24 @@ class ANiStrm(_PluginBase):
                                     }
                                 ],
                             },
+                            {
+                                "component": "VCol",
+                                "props": {
+                                    "cols": 12,
+                                    "md": 3,
+                                },
+                                "content": [
+                                    {
+                                        "component": "VSwitch",
+                                        "props": {
+                                            "model": "incremental",
+                                            "label": "增量检查",
+                                            "hint": "仅处理相对上次清单新增或变更的文件，关闭则每次全量检查",
+                                            "persistent-hint": True,
+                                        },
+                                    }
+                                ],
+                            },
                         ],
                     },
                     {
@@ -238,7 +516,7 @@ class ANiStrm(_PluginBase):
                                 "component": "VCol",
                                 "props": {
                                     "cols": 12,
-                                    "md": 6,
+                                    "md": 3,
                                 },
                                 "content": [
                                     {
@@ -255,7 +533,27 @@ class ANiStrm(_PluginBase):
                                 "component": "VCol",
                                 "props": {
                                     "cols": 12,
-                                    "md": 6,
+                                    "md": 3,
+                                },
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "max_workers",
+                                            "label": "并发拉取数",
+                                            "placeholder": "4",
+                                            "type": "number",
+                                            "hint": "同时拉取的季度目录数量，设为1则逐季拉取",
+                                            "persistent-hint": True,
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {
+                                    "cols": 12,
+                                    "md": 3,
                                 },
                                 "content": [
                                     {
@@ -264,7 +562,25 @@ class ANiStrm(_PluginBase):
                                             "model": "proxy_base",
                                             "label": "反代地址",
                                             "placeholder": "https://openani.an-i.workers.dev",
-                                            "hint": "用于季度目录读取和strm源地址生成，留空则使用官方默认地址",
+                                            "hint": "用于季度目录读取和strm源地址生成，多个镜像用逗号分隔，留空则使用官方默认地址",
+                                            "persistent-hint": True,
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {
+                                    "cols": 12,
+                                    "md": 3,
+                                },
+                                "content": [
+                                    {
+                                        "component": "VSwitch",
+                                        "props": {
+                                            "model": "spread_mirrors",
+                                            "label": "strm分散镜像",
+                                            "hint": "配置多个镜像时，新建strm按文件名分散到各镜像，分担播放压力",
                                             "persistent-hint": True,
                                         },
                                     }
@@ -279,7 +595,7 @@ class ANiStrm(_PluginBase):
                                 "component": "VCol",
                                 "props": {
                                     "cols": 12,
-                                    "md": 6,
+                                    "md": 4,
                                 },
                                 "content": [
                                     {
@@ -301,7 +617,7 @@ class ANiStrm(_PluginBase):
                                 "component": "VCol",
                                 "props": {
                                     "cols": 12,
-                                    "md": 6,
+                                    "md": 4,
                                 },
                                 "content": [
                                     {
@@ -314,6 +630,198 @@ class ANiStrm(_PluginBase):
                                     }
                                 ],
                             },
+                            {
+                                "component": "VCol",
+                                "props": {
+                                    "cols": 12,
+                                    "md": 4,
+                                },
+                                "content": [
+                                    {
+                                        "component": "VSelect",
+                                        "props": {
+                                            "model": "reconcile_mode",
+                                            "label": "失效strm清理",
+                                            "items": [
+                                                {"title": "关闭", "value": "off"},
+                                                {"title": "仅预览（日志）", "value": "dry_run"},
+                                                {"title": "移入隔离目录", "value": "quarantine"},
+                                                {"title": "直接删除", "value": "delete"},
+                                            ],
+                                            "hint": "上游改名或删除的文件，对应strm按此方式处理；隔离目录为存储目录下的 .anistrm-quarantine",
+                                            "persistent-hint": True,
+                                        },
+                                    }
+                                ],
+                            },
+                        ],
+                    },
+                    {
+                        "component": "VRow",
+                        "content": [
+                            {
+                                "component": "VCol",
+                                "props": {
+                                    "cols": 12,
+                                    "md": 4,
+                                },
+                                "content": [
+                                    {
+                                        "component": "VSelect",
+                                        "props": {
+                                            "model": "layout",
+                                            "label": "strm目录布局",
+                                            "items": [
+                                                {"title": "平铺", "value": "flat"},
+                                                {"title": "按季度分目录", "value": "season"},
+                                                {"title": "按番剧分目录", "value": "series"},
+                                            ],
+                                            "hint": "修改后下次运行前会先将已有strm迁移到新布局",
+                                            "persistent-hint": True,
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {
+                                    "cols": 12,
+                                    "md": 4,
+                                },
+                                "content": [
+                                    {
+                                        "component": "VSwitch",
+                                        "props": {
+                                            "model": "migrate_layout",
+                                            "label": "迁移已有strm到当前布局",
+                                            "hint": "立即将已有strm移动到当前布局，目标已存在时删除旧位置的重复文件",
+                                            "persistent-hint": True,
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {
+                                    "cols": 12,
+                                    "md": 4,
+                                },
+                                "content": [
+                                    {
+                                        "component": "VSwitch",
+                                        "props": {
+                                            "model": "adaptive_schedule",
+                                            "label": "自适应调度",
+                                            "hint": "按历史更新时段自动调整检查频率，开启后忽略执行周期",
+                                            "persistent-hint": True,
+                                        },
+                                    }
+                                ],
+                            },
+                        ],
+                    },
+                    {
+                        "component": "VRow",
+                        "content": [
+                            {
+                                "component": "VCol",
+                                "props": {
+                                    "cols": 12,
+                                    "md": 4,
+                                },
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "adaptive_idle_hours",
+                                            "label": "自适应空闲检查间隔（小时）",
+                                            "placeholder": "6",
+                                            "type": "number",
+                                            "hint": "已掌握更新时段的季度，在时段外最长间隔多久检查一次",
+                                            "persistent-hint": True,
+                                        },
+                                    }
+                                ],
+                            },
+                        ],
+                    },
+                    {
+                        "component": "VRow",
+                        "content": [
+                            {
+                                "component": "VCol",
+                                "props": {
+                                    "cols": 12,
+                                    "md": 3,
+                                },
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "write_batch_size",
+                                            "label": "批量写入数",
+                                            "placeholder": "200",
+                                            "type": "number",
+                                            "hint": "strm先写入临时目录，每满该数量统一移动到存储目录",
+                                            "persistent-hint": True,
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {
+                                    "cols": 12,
+                                    "md": 3,
+                                },
+                                "content": [
+                                    {
+                                        "component": "VSwitch",
+                                        "props": {
+                                            "model": "fsync",
+                                            "label": "批次落盘同步",
+                                            "hint": "写入后同步临时文件与目标目录，断电时更安全，但写入稍慢",
+                                            "persistent-hint": True,
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {
+                                    "cols": 12,
+                                    "md": 3,
+                                },
+                                "content": [
+                                    {
+                                        "component": "VSwitch",
+                                        "props": {
+                                            "model": "streaming",
+                                            "label": "流式解析目录",
+                                            "hint": "边下载边生成strm，适合超大目录；开启后逐季拉取且不使用目录缓存",
+                                            "persistent-hint": True,
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {
+                                    "cols": 12,
+                                    "md": 3,
+                                },
+                                "content": [
+                                    {
+                                        "component": "VSwitch",
+                                        "props": {
+                                            "model": "prefetch_pages",
+                                            "label": "预取下一页",
+                                            "hint": "分页目录在写入当前页时预先拉取下一页",
+                                            "persistent-hint": True,
+                                        },
+                                    }
+                                ],
+                            },
                         ],
                     },
                     {
@@ -361,6 +869,18 @@ class ANiStrm(_PluginBase):
             "selected_seasons": ["latest"],
             "proxy_base": "https://openani.an-i.workers.dev",
             "cron": "20 22,23,0,1 * * *",
+            "max_workers": 4,
+            "incremental": True,
+            "write_batch_size": 200,
+            "fsync": False,
+            "streaming": False,
+            "prefetch_pages": True,
+            "spread_mirrors": False,
+            "reconcile_mode": "off",
+            "layout": "flat",
+            "migrate_layout": False,
+            "adaptive_schedule": False,
+            "adaptive_idle_hours": 6,
         }
 
     def __build_season_options(self) -> List[Dict[str, str]]:
@@ -379,12 +899,163 @@ class ANiStrm(_PluginBase):
                 "storageplace": self._storageplace,
                 "selected_seasons": self._selected_seasons,
                 "proxy_base": self._proxy_base,
+                "max_workers": self._max_workers,
+                "incremental": self._incremental,
+                "write_batch_size": self._write_batch_size,
+                "fsync": self._fsync,
+                "streaming": self._streaming,
+                "prefetch_pages": self._prefetch_pages,
+                "spread_mirrors": self._spread_mirrors,
+                "reconcile_mode": self._reconcile_mode,
+                "layout": self._layout,
+                "migrate_layout": self._migrate_layout,
+                "adaptive_schedule": self._adaptive_schedule,
+                "adaptive_idle_hours": self._adaptive_idle_hours,
             }
         )
 
     def get_page(self) -> List[dict]:
-        pass
-
+        history = self.get_data("run_metrics") or []
+        if not history:
+            return [
+                {
+                    "component": "div",
+                    "text": "暂无运行数据",
+                    "props": {"class": "text-center"},
+                }
+            ]
+        last_run = history[-1]
+        summary = [
+            ("开始时间", last_run["started_at"]),
+            ("总耗时", f"{last_run['wall_time']}s"),
+            ("目录请求", last_run["requests"]),
+            ("下载", self.__format_bytes(last_run["bytes"])),
+            ("新增/跳过/失败", f"{last_run['created']}/{last_run['exists']}/{last_run['failed']}"),
+            ("重试/失败/熔断", f"{last_run['retries']}/{last_run['request_failures']}/{last_run['short_circuits']}"),
+        ]
+        return [
+            {
+                "component": "VRow",
+                "content": [
+                    {
+                        "component": "VCol",
+                        "props": {"cols": 6, "md": 2},
+                        "content": [
+                            {
+                                "component": "VCard",
+                                "props": {"variant": "tonal"},
+                                "content": [
+                                    {"component": "VCardSubtitle", "text": title},
+                                    {"component": "VCardText", "props": {"class": "text-h6"}, "text": str(value)},
+                                ],
+                            }
+                        ],
+                    }
+                    for title, value in summary
+                ],
+            },
+            self.__build_table(
+                "最近一次各季度",
+                ["季度", "请求", "错误", "请求耗时", "最大延迟", "下载", "文件", "新增", "跳过", "失败", "处理耗时"],
+                [
+                    [
+                        item["season"],
+                        item["requests"],
+                        item["errors"],
+                        f"{item['fetch_time']}s",
+                        f"{item['max_latency']}s",
+                        self.__format_bytes(item["bytes"]),
+                        item.get("total", "-"),
+                        item.get("created", "-"),
+                        item.get("exists", "-"),
+                        item.get("failed", "-"),
+                        f"{item['duration']}s",
+                    ]
+                    for item in last_run["seasons"]
+                ],
+            ),
+            self.__build_table(
+                "请求延迟分布",
+                list(last_run["latency_histogram"].keys()),
+                [list(last_run["latency_histogram"].values())],
+            ),
+            self.__build_table(
+                "镜像",
+                ["镜像", "平均延迟", "请求", "错误", "状态"],
+                [
+                    [
+                        item["mirror"],
+                        f"{int(item['latency'] * 1000)}ms" if item["latency"] is not None else "-",
+                        item["requests"],
+                        item["errors"],
+                        "可用" if item["healthy"] else "不可用",
+                    ]
+                    for item in last_run["mirrors"]
+                ],
+            ),
+            self.__build_table(
+                "运行历史",
+                ["开始时间", "总耗时", "请求", "下载", "新增", "跳过", "失败", "清理", "重试"],
+                [
+                    [
+                        run["started_at"],
+                        f"{run['wall_time']}s",
+                        run["requests"],
+                        self.__format_bytes(run["bytes"]),
+                        run["created"],
+                        run["exists"],
+                        run["failed"],
+                        run["pruned"],
+                        run["retries"],
+                    ]
+                    for run in reversed(history)
+                ],
+            ),
+        ]
+
+    @staticmethod
+    def __build_table(title: str, headers: List[str], rows: List[List[Any]]) -> dict:
+        return {
+            "component": "VCard",
+            "props": {"class": "mt-3"},
+            "content": [
+                {"component": "VCardTitle", "text": title},
+                {
+                    "component": "VTable",
+                    "props": {"density": "compact", "hover": True},
+                    "content": [
+                        {
+                            "component": "thead",
+                            "content": [
+                                {
+                                    "component": "tr",
+                                    "content": [{"component": "th", "text": header} for header in headers],
+                                }
+                            ],
+                        },
+                        {
+                            "component": "tbody",
+                            "content": [
+                                {
+                                    "component": "tr",
+                                    "content": [{"component": "td", "text": str(cell)} for cell in row],
+                                }
+                                for row in rows
+                            ],
+                        },
+                    ],
+                },
+            ],
+        }
+
+    @staticmethod
+    def __format_bytes(size: int) -> str:
+        for unit in ("B", "KB", "MB"):
+            if size < 1024:
+                return f"{size:.0f}{unit}" if unit == "B" else f"{size:.1f}{unit}"
+            size /= 1024
+        return f"{size:.1f}GB"
+
     def stop_service(self):
         try:
             if self._scheduler:
@@ -397,19 +1068,85 @@ class ANiStrm(_PluginBase):
 
 
 class AniStrmClient:
-    def __init__(self, request_factory=None, proxy_base: Optional[str] = None, use_proxy: bool = False):
+    MAX_PAGES = 1000
+
+    def __init__(
+        self,
+        request_factory=None,
+        proxy_base: Optional[str] = None,
+        use_proxy: bool = False,
+        cache_dir: Optional[Path] = None,
+        cache_ttl: int = 300,
+    ):
         self._request_factory = request_factory or self._build_request_utils
-        self._proxy_base = self.normalize_proxy_base(proxy_base)
-        self._season_options_cache: List[str] = []
+        self._response_cache = FolderResponseCache(cache_dir=cache_dir, ttl=cache_ttl)
+        self.metrics = RunMetrics()
+        self.retry_policy = RetryPolicy()
+        proxy_bases = self.parse_proxy_bases(proxy_base)
+        self._proxy_base = proxy_bases[0]
+        self._mirror_pool = MirrorPool(proxy_bases)
+        self._root_index: Optional[SeasonRootIndex] = None
+        self._root_lock = threading.Lock()
+        self._prefetch_pages = True
+        self._incomplete_seasons: Set[str] = set()
+        self._listing_lock = threading.Lock()
         self._use_proxy = use_proxy
 
-    def set_proxy_base(self, proxy_base: Optional[str]):
-        self._proxy_base = self.normalize_proxy_base(proxy_base)
-        self._season_options_cache = []
+    def set_proxy_base(self, proxy_base: Union[str, List[str], None]):
+        proxy_bases = self.parse_proxy_bases(proxy_base)
+        self._proxy_base = proxy_bases[0]
+        self._mirror_pool.set_mirrors(proxy_bases)
+        self._root_index = None
+
+    @property
+    def mirrors(self) -> List[str]:
+        return self._mirror_pool.mirrors
+
+    def mirror_snapshot(self) -> List[Dict[str, Any]]:
+        return self._mirror_pool.snapshot()
+
+    def probe_mirrors(self):
+        """
+        配置多个镜像时，并发请求各镜像根目录测量延迟，结果同时写入目录缓存
+        """
+        mirrors = self._mirror_pool.mirrors
+        if len(mirrors) < 2:
+            return
+
+        def probe(mirror: str):
+            try:
+                self._fetch_folder_payload(f"{mirror}/", revalidate=True)
+            except Exception as err:
+                logger.debug(f"ANi-Strm镜像探测失败：{mirror} - {err}")
+
+        with ThreadPoolExecutor(max_workers=len(mirrors), thread_name_prefix="anistrm-probe") as executor:
+            list(executor.map(probe, mirrors))
+        logger.info(f"ANi-Strm镜像探测完成：{self._mirror_pool.describe()}，当前使用={self._get_openani_base()}")
 
     def set_use_proxy(self, use_proxy: bool):
         self._use_proxy = use_proxy
-        self._season_options_cache = []
+        self._root_index = None
+
+    def set_cache_dir(self, cache_dir: Optional[Path]):
+        self._response_cache.set_cache_dir(cache_dir)
+
+    def set_prefetch_pages(self, prefetch_pages: bool):
+        self._prefetch_pages = prefetch_pages
+
+    def reset_listing_status(self):
+        with self._listing_lock:
+            self._incomplete_seasons = set()
+
+    def is_listing_complete(self, season: str) -> bool:
+        """
+        本次任务中该季度目录是否完整读取（未出现请求失败或分页中断）
+        """
+        with self._listing_lock:
+            return season not in self._incomplete_seasons
+
+    def _mark_incomplete(self, season: str):
+        with self._listing_lock:
+            self._incomplete_seasons.add(season)
 
     def get_current_season(self, idx_month: Optional[int] = None, now: Optional[datetime] = None) -> str:
         remote_season = self._get_latest_remote_season()
@@ -428,69 +1165,255 @@ class AniStrmClient:
         return self.get_season_list(season)
 
     def get_season_list(self, season: str) -> List[str]:
-        def operation():
-            payload = self._fetch_folder_payload(f"{self._get_openani_base()}/{season}/")
-            files = payload.get("files") or []
-            return [file_info["name"] for file_info in files if file_info.get("name")]
+        return [file_info["name"] for file_info in self.get_season_files(season)]
 
-        return self._with_retry(operation, default=[])
+    def get_season_files(self, season: str) -> List[Dict[str, Any]]:
+        return list(itertools.chain.from_iterable(self.iter_season_pages(season)))
 
-    def _get_latest_remote_season(self) -> Optional[str]:
-        def operation():
-            payload = self._fetch_folder_payload(f"{self._get_openani_base()}/")
-            return self._extract_latest_season(payload.get("files") or [])
+    def iter_season_pages(self, season: str, prefetch: bool = False) -> Iterator[List[Dict[str, Any]]]:
+        """
+        按 nextPageToken 逐页读取季度目录；prefetch 时在处理当前页的同时预取下一页
+        """
+        path = f"{season}/"
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="anistrm-page") if prefetch else None
+        try:
+            page_token = None
+            page_index = 0
+            next_page = None
+            seen_tokens: Set[str] = set()
+            listed = 0
+            while True:
+                if next_page is not None:
+                    payload = next_page.result()
+                else:
+                    payload = self._fetch_page(path, page_token, page_index)
+                if payload is None:
+                    self._mark_incomplete(season)
+                    if page_index:
+                        logger.warning(f"ANi-Strm分页读取中断：{path}，已读取{page_index}页")
+                    return
+                if not isinstance(payload.get("files"), list):
+                    # 200 但不是目录列表（例如错误信息），不能当作空目录
+                    self._mark_incomplete(season)
+                    logger.warning(f"ANi-Strm目录响应缺少 files：{path}，第{page_index + 1}页")
+                    return
+                files = [file_info for file_info in payload["files"] if file_info.get("name")]
+                listed += len(files)
 
-        return self._with_retry(operation, default=None)
+                page_token = payload.get("nextPageToken")
+                page_index += 1
+                next_page = None
+                if not page_token or page_token in seen_tokens or page_index >= self.MAX_PAGES:
+                    if (page_token and page_index >= self.MAX_PAGES) or not listed:
+                        self._mark_incomplete(season)
+                    yield files
+                    return
+                seen_tokens.add(page_token)
+                if executor:
+                    next_page = executor.submit(self._fetch_page, path, page_token, page_index)
+                yield files
+        finally:
+            if executor:
+                executor.shutdown(wait=True)
 
-    def get_available_seasons(self, use_cache: bool = True) -> List[str]:
-        if use_cache and self._season_options_cache:
-            return list(self._season_options_cache)
-
-        def operation():
-            payload = self._fetch_folder_payload(f"{self._get_openani_base()}/")
-            seasons = []
-            for file_info in payload.get("files") or []:
-                name = file_info.get("name") or ""
-                mime_type = file_info.get("mimeType") or ""
-                if mime_type != "application/vnd.google-apps.folder":
-                    continue
-                parts = name.split("-", 1)
-                if len(parts) != 2 or not parts[0].isdigit() or not parts[1].isdigit():
-                    continue
-                seasons.append(name)
-            seasons.sort(key=lambda item: tuple(map(int, item.split("-"))), reverse=True)
-            return seasons
+    def _fetch_page(self, path: str, page_token: Optional[str], page_index: int) -> Optional[Dict[str, Any]]:
+        return self._with_retry(
+            lambda url: self._fetch_folder_payload(url, page_token=page_token, page_index=page_index),
+            default=None,
+            path=path,
+        )
 
-        seasons = self._with_retry(operation, default=[])
-        self._season_options_cache = list(seasons)
-        return seasons
+    def iter_season_files(
+        self, seasons: List[str], max_workers: int = 1
+    ) -> Iterator[Tuple[str, Iterable[Dict[str, Any]]]]:
+        """
+        并发拉取多个季度目录，按完成顺序产出 (季度, 文件信息)；
+        单线程时按页惰性产出并预取下一页，写盘与拉取交替进行
+        """
+        workers = max(1, min(max_workers, len(seasons)))
+        if workers == 1:
+            for season in seasons:
+                pages = self.iter_season_pages(season, prefetch=self._prefetch_pages)
+                yield season, itertools.chain.from_iterable(pages)
+            return
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="anistrm-fetch") as executor:
+            futures = {executor.submit(self.get_season_files, season): season for season in seasons}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
 
-    def _fetch_folder_payload(self, url: str) -> Dict[str, Any]:
+    def iter_season_files_stream(self, season: str) -> Iterator[Dict[str, Any]]:
+        """
+        流式读取季度目录，边下载边解析 files 数组，内存占用与目录大小无关
+        """
+        path = f"{season}/"
+        page_token = None
+        page_index = 0
+        seen_tokens: Set[str] = set()
+        listed = 0
+        while page_index < self.MAX_PAGES:
+            response = self._with_retry(
+                lambda url: self._open_folder_stream(url, page_token=page_token, page_index=page_index),
+                default=None,
+                path=path,
+            )
+            if response is None:
+                self._mark_incomplete(season)
+                return
+            parser = FolderStreamParser()
+            try:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    self.metrics.add_bytes(season, len(chunk))
+                    for file_info in parser.feed(chunk):
+                        if file_info.get("name"):
+                            listed += 1
+                            yield file_info
+                parser.close()
+            except Exception as err:
+                self._mark_incomplete(season)
+                logger.warning(f"ANi-Strm流式读取目录中断：{path} - {err}")
+                return
+            finally:
+                response.close()
+
+            page_token = parser.next_page_token
+            if not page_token or page_token in seen_tokens:
+                if not listed:
+                    # 空目录无法与异常响应区分，不作为完整列表参与清理
+                    self._mark_incomplete(season)
+                return
+            seen_tokens.add(page_token)
+            page_index += 1
+        self._mark_incomplete(season)
+
+    def _open_folder_stream(self, url: str, page_token: Optional[str] = None, page_index: int = 0):
+        started = time.monotonic()
         response = self._request_factory().post(
             url=url,
-            data='{"password":""}',
+            data=self._build_folder_body(page_token, page_index),
+            stream=True,
+        )
+        if not response:
+            raise self._request_failed(url, response)
+        elapsed = time.monotonic() - started
+        self._mirror_pool.record_success(url, elapsed)
+        self.metrics.record_request(url, elapsed)
+        return response
+
+    @staticmethod
+    def _build_folder_body(page_token: Optional[str] = None, page_index: int = 0) -> str:
+        if not page_token:
+            return '{"password":""}'
+        return json.dumps({"password": "", "page_token": page_token, "page_index": page_index})
+
+    def _get_latest_remote_season(self) -> Optional[str]:
+        root_index = self.get_root_index()
+        return root_index.latest if root_index else None
+
+    def get_available_seasons(self, use_cache: bool = True) -> List[str]:
+        root_index = self.get_root_index(allow_stale=use_cache)
+        return list(root_index.seasons) if root_index else []
+
+    def get_root_index(self, allow_stale: bool = False) -> Optional["SeasonRootIndex"]:
+        """
+        获取根目录季度索引，刷新窗口内所有季度相关调用共用同一份解析结果
+        """
+        with self._root_lock:
+            root_index = self._root_index
+            if root_index and (allow_stale or time.time() - root_index.built_at < self._response_cache.ttl):
+                return root_index
+
+            def operation(url: str):
+                payload = self._fetch_folder_payload(url, allow_stale=allow_stale)
+                return SeasonRootIndex.from_payload(payload)
+
+            root_index = self._with_retry(operation, default=None, path="")
+            if root_index:
+                self._root_index = root_index
+            return root_index
+
+    def _fetch_folder_payload(
+        self,
+        url: str,
+        allow_stale: bool = False,
+        page_token: Optional[str] = None,
+        page_index: int = 0,
+        revalidate: bool = False,
+    ) -> Dict[str, Any]:
+        cache_key = f"{url}#page_token={page_token}" if page_token else url
+        entry = self._response_cache.get(cache_key)
+        if entry and not revalidate and (allow_stale or self._response_cache.is_fresh(entry)):
+            return entry["payload"]
+
+        started = time.monotonic()
+        response = self._request_factory(headers=FolderResponseCache.conditional_headers(entry)).post(
+            url=url,
+            data=self._build_folder_body(page_token, page_index),
         )
         if not response:
-            raise ValueError(f"目录请求失败：{url}")
+            raise self._request_failed(url, response)
         try:
-            return response.json()
+            if response.status_code == 304 and entry:
+                elapsed = time.monotonic() - started
+                self._mirror_pool.record_success(url, elapsed)
+                self.metrics.record_request(url, elapsed)
+                logger.debug(f"ANi-Strm目录未变更，复用缓存：{cache_key}")
+                self._response_cache.touch(cache_key)
+                return entry["payload"]
+            try:
+                payload = response.json()
+            except ValueError:
+                self._mirror_pool.record_failure(url)
+                self.metrics.record_error(url)
+                raise
+            elapsed = time.monotonic() - started
+            self._mirror_pool.record_success(url, elapsed)
+            self.metrics.record_request(url, elapsed, len(response.content or b""))
+            self._response_cache.put(
+                cache_key,
+                payload,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+            )
+            return payload
         finally:
             response.close()
 
-    def _build_request_utils(self) -> RequestUtils:
+    def _build_request_utils(self, headers: Optional[Dict[str, str]] = None) -> RequestUtils:
+        if headers:
+            headers = {
+                "User-Agent": settings.USER_AGENT,
+                "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
+                **headers,
+            }
         return RequestUtils(
+            headers=headers or None,
             ua=settings.USER_AGENT if settings.USER_AGENT else None,
             proxies=settings.PROXY if self._use_proxy and settings.PROXY else None,
         )
 
+    def _request_failed(self, url: str, response) -> "FolderRequestError":
+        err = FolderRequestError.from_response(url, response)
+        self.metrics.record_error(url)
+        if err.retryable:
+            self._mirror_pool.record_failure(url)
+        return err
+
     @staticmethod
     def normalize_proxy_base(proxy_base: Optional[str]) -> str:
         if not proxy_base:
             return "https://openani.an-i.workers.dev"
         return proxy_base.strip().rstrip("/")
 
+    @classmethod
+    def parse_proxy_bases(cls, proxy_base: Union[str, List[str], None]) -> List[str]:
+        if isinstance(proxy_base, str):
+            proxy_base = re.split(r"[,，\s]+", proxy_base)
+        bases = [cls.normalize_proxy_base(base) for base in proxy_base or [] if base and base.strip()]
+        return list(dict.fromkeys(bases)) or [cls.normalize_proxy_base(None)]
+
     def _get_openani_base(self) -> str:
-        return self._proxy_base or "https://openani.an-i.workers.dev"
+        return self._mirror_pool.select() or self._proxy_base or "https://openani.an-i.workers.dev"
 
     def normalize_stream_link(self, link: str) -> str:
         parsed = urlparse(link)
@@ -509,42 +1432,364 @@ class AniStrmClient:
             )
         )
 
+    def _with_retry(self, operation: Callable[[str], Any], default, path: str = ""):
+        """
+        在当前最优镜像上执行请求，镜像不可用时依次切换到其他镜像
+        """
+        failed = object()
+        tried: Set[str] = set()
+        while True:
+            base = self._mirror_pool.select(exclude=tried)
+            if base is None:
+                return default
+            tried.add(base)
+            url = f"{base}/{path}"
+            host = urlparse(base).netloc
+            # 镜像冷却期短于主机熔断冷却期，熔断中的镜像虽被选中也应视为不可用
+            short_circuited = self.retry_policy.is_open(host)
+            result = self.retry_policy.call(lambda: operation(url), default=failed, host=host)
+            if result is not failed:
+                return result
+            if len(tried) >= len(self._mirror_pool):
+                return default
+            if not short_circuited and self._mirror_pool.is_healthy(base):
+                return default
+            logger.warning(f"ANi-Strm镜像 {base} 不可用，切换其他镜像重试")
+
+
+class MirrorPool:
+    """
+    反代镜像池：记录各镜像的滑动平均延迟与连续失败次数，目录读取时选择最快的可用镜像
+    """
+
+    def __init__(self, mirrors: List[str], cooldown: float = 300, alpha: float = 0.3):
+        self._cooldown = cooldown
+        self._alpha = alpha
+        self._lock = threading.Lock()
+        self._mirrors: List[str] = []
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self.set_mirrors(mirrors)
+
+    def set_mirrors(self, mirrors: List[str]):
+        with self._lock:
+            self._mirrors = list(mirrors)
+            self._stats = {
+                mirror: self._stats.get(mirror) or {"latency": None, "failures": 0, "failed_at": 0, "requests": 0, "errors": 0}
+                for mirror in self._mirrors
+            }
+
+    @property
+    def mirrors(self) -> List[str]:
+        return list(self._mirrors)
+
+    def __len__(self) -> int:
+        return len(self._mirrors)
+
+    def _match(self, url: str) -> Optional[str]:
+        matched = [mirror for mirror in self._mirrors if url == mirror or url.startswith(f"{mirror}/")]
+        return max(matched, key=len) if matched else None
+
+    def record_success(self, url: str, elapsed: float):
+        with self._lock:
+            stats = self._stats.get(self._match(url))
+            if stats is None:
+                return
+            stats["requests"] += 1
+            stats["failures"] = 0
+            latency = stats["latency"]
+            stats["latency"] = elapsed if latency is None else latency * (1 - self._alpha) + elapsed * self._alpha
+
+    def record_failure(self, url: str):
+        with self._lock:
+            stats = self._stats.get(self._match(url))
+            if stats is None:
+                return
+            stats["requests"] += 1
+            stats["errors"] += 1
+            stats["failures"] += 1
+            stats["failed_at"] = time.time()
+
+    def is_healthy(self, mirror: str) -> bool:
+        stats = self._stats.get(mirror)
+        if stats is None:
+            return False
+        return not stats["failures"] or time.time() - stats["failed_at"] >= self._cooldown
+
+    def select(self, exclude: Iterable[str] = ()) -> Optional[str]:
+        with self._lock:
+            exclude = set(exclude)
+            candidates = [mirror for mirror in self._mirrors if mirror not in exclude]
+            if not candidates:
+                return None
+            healthy = [mirror for mirror in candidates if self.is_healthy(mirror)]
+            if healthy:
+                return min(
+                    healthy,
+                    key=lambda mirror: (
+                        self._stats[mirror]["latency"] is None,
+                        self._stats[mirror]["latency"] or 0.0,
+                        self._mirrors.index(mirror),
+                    ),
+                )
+            return min(candidates, key=lambda mirror: self._stats[mirror]["failed_at"])
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {
+                    "mirror": mirror,
+                    "latency": round(self._stats[mirror]["latency"], 3) if self._stats[mirror]["latency"] is not None else None,
+                    "requests": self._stats[mirror]["requests"],
+                    "errors": self._stats[mirror]["errors"],
+                    "healthy": self.is_healthy(mirror),
+                }
+                for mirror in self._mirrors
+            ]
+
+    def describe(self) -> str:
+        return "，".join(
+            f"{item['mirror']}="
+            f"{'%.0fms' % (item['latency'] * 1000) if item['latency'] is not None else '未知'}"
+            f"{'' if item['healthy'] else '(不可用)'}"
+            for item in self.snapshot()
+        )
+
+
+class FolderRequestError(Exception):
+    """
+    目录请求失败，携带状态码与 Retry-After，供重试策略判断
+    """
+
+    def __init__(self, message: str, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        return self.status_code is None or self.status_code == 429 or self.status_code >= 500
+
+    @classmethod
+    def from_response(cls, url: str, response) -> "FolderRequestError":
+        if response is None:
+            return cls(f"目录请求失败：{url}")
+        status_code = response.status_code
+        retry_after = None
+        if status_code in (429, 503):
+            retry_after = cls.parse_retry_after(response.headers.get("Retry-After"))
+        try:
+            response.close()
+        except Exception:
+            pass
+        return cls(f"目录请求失败：{url}，状态码={status_code}", status_code=status_code, retry_after=retry_after)
+
     @staticmethod
-    def _with_retry(operation, default, tries: int = 3, delay: int = 3):
-        remaining = tries
-        wait_seconds = delay
-        while remaining > 0:
+    def parse_retry_after(value: Optional[str]) -> Optional[float]:
+        if not value:
+            return None
+        value = value.strip()
+        if value.isdigit():
+            return float(value)
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, retry_at.timestamp() - time.time())
+
+
+class RetryPolicy:
+    """
+    请求重试策略：指数退避加随机抖动，遵循 Retry-After；
+    同一主机连续失败达到阈值后熔断，冷却期内的请求直接返回默认值
+    """
+
+    def __init__(
+        self,
+        tries: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        failure_threshold: int = 2,
+        cooldown: float = 600,
+        sleep=time.sleep,
+    ):
+        self._tries = max(1, tries)
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._failure_threshold = failure_threshold
+        self._cooldown = cooldown
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, Dict[str, float]] = {}
+        self.stats: Dict[str, int] = {}
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {"retries": 0, "failures": 0, "short_circuits": 0}
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def is_open(self, host: str) -> bool:
+        with self._lock:
+            state = self._hosts.get(host)
+            if not state or not state.get("opened_at"):
+                return False
+            if time.time() - state["opened_at"] >= self._cooldown:
+                # 冷却结束，放行一次试探请求
+                state["opened_at"] = 0
+                state["failures"] = self._failure_threshold - 1
+                return False
+            return True
+
+    def _record_success(self, host: str):
+        with self._lock:
+            self._hosts.pop(host, None)
+
+    def _record_failure(self, host: str):
+        with self._lock:
+            state = self._hosts.setdefault(host, {"failures": 0, "opened_at": 0})
+            state["failures"] += 1
+            if state["failures"] >= self._failure_threshold and not state["opened_at"]:
+                state["opened_at"] = time.time()
+                logger.warning(f"ANiStrm {host} 连续失败{int(state['failures'])}次，{int(self._cooldown)}秒内不再请求")
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> Optional[float]:
+        delay = min(self._max_delay, self._base_delay * (2 ** attempt))
+        delay = delay / 2 + random.uniform(0, delay / 2)
+        if retry_after is not None:
+            if retry_after > self._max_delay:
+                return None
+            delay = max(delay, retry_after)
+        return delay
+
+    def call(self, operation, default, host: str):
+        if self.is_open(host):
+            self._count("short_circuits")
+            logger.debug(f"ANiStrm {host} 已熔断，跳过请求")
+            return default
+
+        for attempt in range(self._tries):
             try:
-                return operation()
+                result = operation()
             except Exception as err:
-                remaining -= 1
-                if remaining == 0:
+                if not getattr(err, "retryable", True):
+                    self._record_success(host)
+                    logger.warning(f"ANiStrm请求失败：{err}")
+                    return default
+                if attempt + 1 >= self._tries:
                     logger.warning(f"ANiStrm请求失败，已达到最大重试次数：{err}")
                     break
-                logger.warning(f"未获取到文件信息，{wait_seconds}秒后重试 ...")
-                time.sleep(wait_seconds)
+                wait_seconds = self.backoff(attempt, getattr(err, "retry_after", None))
+                if wait_seconds is None:
+                    logger.warning(f"ANiStrm请求被限流且 Retry-After 过长，放弃重试：{err}")
+                    break
+                self._count("retries")
+                logger.warning(f"未获取到文件信息，{wait_seconds:.1f}秒后重试 ...")
+                self._sleep(wait_seconds)
+            else:
+                self._record_success(host)
+                return result
+
+        self._count("failures")
+        self._record_failure(host)
         logger.warning("请确保当前季度番剧文件夹存在或检查网络问题")
         return default
 
-    @staticmethod
-    def _extract_latest_season(files: List[Dict[str, str]]) -> Optional[str]:
-        seasons: List[Tuple[int, int]] = []
-        for file_info in files:
-            name = file_info.get("name") or ""
-            mime_type = file_info.get("mimeType") or ""
-            if mime_type != "application/vnd.google-apps.folder":
-                continue
-            parts = name.split("-", 1)
-            if len(parts) != 2 or not parts[0].isdigit() or not parts[1].isdigit():
-                continue
-            seasons.append((int(parts[0]), int(parts[1])))
-        if not seasons:
-            return None
-        year, month = max(seasons)
-        return f"{year}-{month}"
+
+class StrmLayout:
+    """
+    strm目录布局：flat 全部平铺；season 按季度分目录；series 按番剧名分目录
+    """
+
+    FLAT = "flat"
+    SEASON = "season"
+    SERIES = "series"
+
+    _SERIES_PATTERN = re.compile(r"^\[ANi\]\s*(?P<title>.+?)\s+-\s+\d+(?:\.\d+)?(?:v\d+)?(?=\s|\[|\.|$)")
+    _TAG_PATTERN = re.compile(r"\[[^\]]*\]")
+    _INVALID_CHARS = re.compile(r'[\\/:*?"<>|]')
+    _SEASON_URL_PATTERN = re.compile(r"/(\d{4}-\d{1,2})/")
+
+    def __init__(self, mode: str = FLAT):
+        self.mode = mode if mode in (self.FLAT, self.SEASON, self.SERIES) else self.FLAT
+
+    def relative_dir(self, season: Optional[str], file_name: str) -> str:
+        if self.mode == self.SEASON:
+            return season or ""
+        if self.mode == self.SERIES:
+            return self.parse_series(file_name)
+        return ""
+
+    @classmethod
+    def parse_series(cls, file_name: str) -> str:
+        match = cls._SERIES_PATTERN.match(file_name)
+        if match:
+            title = match.group("title")
+        else:
+            title = cls._TAG_PATTERN.sub("", os.path.splitext(file_name)[0])
+        title = cls._INVALID_CHARS.sub(" ", title).strip(" .")
+        return title or ""
+
+    @classmethod
+    def parse_season_from_url(cls, url: str) -> Optional[str]:
+        match = cls._SEASON_URL_PATTERN.search(url)
+        return match.group(1) if match else None
 
 
 class StrmFileService:
+    # 与临时目录一样放在存储目录内，容器只挂载存储目录时隔离文件仍在持久化卷上
+    QUARANTINE_DIR_NAME = ".anistrm-quarantine"
+
+    def __init__(self, batch_size: int = 200, fsync: bool = False, layout: Optional[StrmLayout] = None):
+        self._indexes: Dict[str, Set[str]] = {}
+        self._url_prefixes: Dict[Tuple[str, str], str] = {}
+        self._batch_size = batch_size
+        self._fsync = fsync
+        self._layout = layout or StrmLayout()
+
+    def set_write_options(self, batch_size: int = 200, fsync: bool = False):
+        self._batch_size = batch_size
+        self._fsync = fsync
+
+    def set_layout(self, layout: StrmLayout):
+        self._layout = layout
+        self._indexes = {}
+
+    def reset_index(self):
+        """
+        清空目录索引与链接前缀缓存，每次任务开始时调用，保证索引与磁盘一致
+        """
+        self._indexes = {}
+        self._url_prefixes = {}
+
+    def _get_index(self, directory: Path) -> Set[str]:
+        key = str(directory)
+        index = self._indexes.get(key)
+        if index is not None:
+            return index
+        try:
+            with os.scandir(directory) as entries:
+                index = {entry.name for entry in entries if entry.name.endswith(".strm")}
+        except FileNotFoundError:
+            index = set()
+        self._indexes[key] = index
+        logger.debug(f"ANi-Strm目录索引完成：{directory}，已有strm={len(index)}")
+        return index
+
+    def _relative_path(self, season: Optional[str], file_name: str) -> str:
+        relative_dir = self._layout.relative_dir(season, file_name)
+        strm_name = f"{file_name}.strm"
+        return f"{relative_dir}/{strm_name}" if relative_dir else strm_name
+
+    def _season_url_prefix(self, base_url: str, season: str) -> str:
+        key = (base_url, season)
+        prefix = self._url_prefixes.get(key)
+        if prefix is None:
+            prefix = self._url_prefixes[key] = f"{base_url.rstrip('/')}/{season}/"
+        return prefix
+
     @staticmethod
     def build_season_url(season: str, file_name: str, base_url: str) -> str:
         encoded_filename = quote(file_name, safe="")
@@ -582,17 +1827,752 @@ class StrmFileService:
                 return "failed"
             src_url = self.build_season_url(season, file_name, base_url=base_url)
 
-        directory = Path(storage_path)
-        file_path = directory / f"{file_name}.strm"
-        if file_path.exists():
-            logger.debug(f"ANi-Strm跳过已存在文件：{file_path.name}")
+        relative_path = self._relative_path(season, file_name)
+        file_path = Path(storage_path) / relative_path
+        index = self._indexes.get(str(file_path.parent))
+        exists = file_path.name in index if index is not None else file_path.exists()
+        if exists:
+            logger.debug(f"ANi-Strm跳过已存在文件：{relative_path}")
             return "exists"
 
-        try:
-            directory.mkdir(parents=True, exist_ok=True)
-            file_path.write_text(src_url, encoding="utf-8")
-            logger.debug(f"ANi-Strm创建成功：{file_path.name}")
-            return "created"
-        except Exception as err:
-            logger.error(f"创建strm源文件失败：{file_path.name} - {err}")
+        with StrmBatchWriter(Path(storage_path), batch_size=1, fsync=self._fsync) as writer:
+            writer.add(relative_path, src_url)
+        if not writer.written:
             return "failed"
+        if index is not None:
+            index.add(file_path.name)
+        return "created"
+
+    def touch_many(
+        self,
+        storage_path: str,
+        season: str,
+        names: Iterable[str],
+        base_url: str = "https://openani.an-i.workers.dev",
+        spread_urls: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        批量创建同一季度的strm文件，每个目标目录只扫描和创建一次
+        :param spread_urls: 多个镜像地址时按文件名哈希分散写入strm
+        :return: created/exists/failed 计数，以及失败的文件名 failed_names
+        """
+        result: Dict[str, Any] = {"created": 0, "exists": 0, "failed": 0, "failed_names": []}
+        names = iter(names)
+        first_name = next(names, None)
+        if first_name is None:
+            return result
+        names = itertools.chain([first_name], names)
+
+        if not storage_path:
+            logger.error("创建strm源文件失败：未配置存储目录")
+            result["failed_names"] = list(dict.fromkeys(names))
+            result["failed"] = len(result["failed_names"])
+            return result
+
+        root = Path(storage_path)
+        if spread_urls and len(spread_urls) > 1:
+            prefixes = [self._season_url_prefix(url, season) for url in spread_urls]
+        else:
+            prefixes = [self._season_url_prefix(base_url, season)]
+        # 平铺与按季度布局下同一季度只对应一个目录，无需逐个文件解析
+        fixed_dir = None if self._layout.mode == StrmLayout.SERIES else self._layout.relative_dir(season, "")
+        dir_indexes: Dict[str, Set[str]] = {}
+        seen: Set[str] = set()
+        with StrmBatchWriter(root, batch_size=self._batch_size, fsync=self._fsync) as writer:
+            for file_name in names:
+                if file_name in seen:
+                    continue
+                seen.add(file_name)
+                relative_dir = fixed_dir if fixed_dir is not None else self._layout.relative_dir(season, file_name)
+                strm_name = f"{file_name}.strm"
+                index = dir_indexes.get(relative_dir)
+                if index is None:
+                    directory = root / relative_dir if relative_dir else root
+                    try:
+                        index = dir_indexes[relative_dir] = self._get_index(directory)
+                    except OSError as err:
+                        logger.error(f"读取strm存储目录失败：{directory} - {err}")
+                        writer.failed.append(f"{relative_dir}/{strm_name}" if relative_dir else strm_name)
+                        continue
+                if strm_name in index:
+                    result["exists"] += 1
+                    continue
+                # 只为确实需要写入的文件编码文件名并拼接链接
+                if len(prefixes) > 1:
+                    prefix = prefixes[zlib.crc32(file_name.encode("utf-8")) % len(prefixes)]
+                else:
+                    prefix = prefixes[0]
+                writer.add(
+                    f"{relative_dir}/{strm_name}" if relative_dir else strm_name,
+                    prefix + quote(file_name, safe=""),
+                )
+
+        for relative_path in writer.written:
+            target = root / relative_path
+            self._get_index(target.parent).add(target.name)
+        result["created"] = len(writer.written)
+        result["failed"] = len(writer.failed)
+        result["failed_names"] = [Path(relative_path).name[: -len(".strm")] for relative_path in writer.failed]
+        return result
+
+    def remove_many(
+        self, storage_path: str, season: str, names: Iterable[str], mode: str = "dry_run"
+    ) -> Dict[str, Any]:
+        """
+        删除或隔离指定文件名对应的strm文件
+        :param mode: dry_run 仅返回匹配结果；delete 直接删除；quarantine 移入存储目录内的隐藏隔离目录
+        :return: matched 匹配到的strm相对路径，kept 匹配到但未清理的文件名，removed/failed 计数
+        """
+        result: Dict[str, Any] = {"matched": [], "kept": [], "removed": 0, "failed": 0}
+        root = Path(storage_path)
+        matched_names: List[str] = []
+        for file_name in names:
+            relative_path = self._relative_path(season, file_name)
+            target = root / relative_path
+            try:
+                index = self._get_index(target.parent)
+            except OSError as err:
+                logger.error(f"读取strm存储目录失败：{target.parent} - {err}")
+                continue
+            if target.name in index:
+                result["matched"].append(relative_path)
+                matched_names.append(file_name)
+        if mode not in ("delete", "quarantine") or not result["matched"]:
+            result["kept"] = matched_names
+            return result
+
+        quarantine_root = root / self.QUARANTINE_DIR_NAME
+        for file_name, relative_path in zip(matched_names, result["matched"]):
+            target = root / relative_path
+            try:
+                if mode == "quarantine":
+                    quarantine_path = quarantine_root / relative_path
+                    quarantine_path.parent.mkdir(parents=True, exist_ok=True)
+                    StrmBatchWriter.move(target, quarantine_path)
+                else:
+                    target.unlink(missing_ok=True)
+            except OSError as err:
+                logger.error(f"清理strm文件失败：{relative_path} - {err}")
+                result["failed"] += 1
+                result["kept"].append(file_name)
+                continue
+            self._get_index(target.parent).discard(target.name)
+            result["removed"] += 1
+            logger.debug(f"ANi-Strm已清理：{relative_path}")
+        return result
+
+    def migrate_layout(self, storage_path: str) -> Dict[str, int]:
+        """
+        将存储目录根及一级子目录下的strm按当前布局移动到对应位置，目标已存在时删除旧位置的重复文件；
+        只处理链接中能解析出季度的strm，不影响其他来源的文件
+        """
+        result = {"moved": 0, "duplicates": 0, "skipped": 0, "failed": 0}
+        root = Path(storage_path)
+        if not root.is_dir():
+            return result
+
+        sources: List[Path] = []
+        with os.scandir(root) as entries:
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                if entry.is_file() and entry.name.endswith(".strm"):
+                    sources.append(Path(entry.path))
+                elif entry.is_dir(follow_symlinks=False):
+                    with os.scandir(entry.path) as sub_entries:
+                        sources.extend(
+                            Path(sub_entry.path)
+                            for sub_entry in sub_entries
+                            if sub_entry.is_file() and sub_entry.name.endswith(".strm")
+                        )
+
+        emptied_dirs: Set[Path] = set()
+        for source in sources:
+            file_name = source.name[: -len(".strm")]
+            if self._layout.mode != StrmLayout.SEASON and root / self._relative_path(None, file_name) == source:
+                continue
+            try:
+                season = StrmLayout.parse_season_from_url(source.read_text(encoding="utf-8"))
+            except OSError as err:
+                logger.error(f"读取strm文件失败：{source} - {err}")
+                result["failed"] += 1
+                continue
+            if not season:
+                result["skipped"] += 1
+                continue
+            target = root / self._relative_path(season, file_name)
+            if target == source:
+                continue
+            try:
+                if target.exists():
+                    source.unlink()
+                    result["duplicates"] += 1
+                else:
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    StrmBatchWriter.move(source, target)
+                    result["moved"] += 1
+            except OSError as err:
+                logger.error(f"迁移strm文件失败：{source} - {err}")
+                result["failed"] += 1
+                continue
+            if source.parent != root:
+                emptied_dirs.add(source.parent)
+        for directory in emptied_dirs:
+            try:
+                directory.rmdir()
+            except OSError:
+                pass
+        self._indexes = {}
+        return result
+
+
+class StrmBatchWriter:
+    """
+    strm批量写入：先写入存储目录内的隐藏临时目录（保证同一文件系统），每满一批再重命名到目标目录，
+    避免目录监控读到写了一半的文件；开启 fsync 时只同步本批的临时文件与目标目录
+    """
+
+    TMP_DIR_NAME = ".anistrm-tmp"
+
+    def __init__(self, directory: Path, batch_size: int = 200, fsync: bool = False):
+        self._directory = directory
+        # 放在存储目录内：容器只挂载存储目录时，其父目录可能在另一个文件系统上
+        self._tmp_dir = directory / self.TMP_DIR_NAME
+        self._tmp_ready = False
+        self._ready_dirs: Set[Path] = set()
+        self._batch_size = max(1, batch_size)
+        self._fsync = fsync
+        self._sequence = 0
+        self._pending: List[Tuple[str, str]] = []
+        self.written: List[str] = []
+        self.failed: List[str] = []
+
+    def __enter__(self) -> "StrmBatchWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def add(self, relative_path: str, content: str):
+        """
+        :param relative_path: 相对存储目录的strm路径，可包含一级子目录
+        """
+        self._sequence += 1
+        # 临时文件不用 .strm 后缀，避免不跳过隐藏目录的递归监控把它当成媒体文件
+        tmp_name = f"{self._sequence}.tmp"
+        try:
+            if not self._tmp_ready:
+                self._tmp_dir.mkdir(parents=True, exist_ok=True)
+                self._tmp_ready = True
+            with open(self._tmp_dir / tmp_name, "w", encoding="utf-8") as strm_file:
+                strm_file.write(content)
+                if self._fsync:
+                    strm_file.flush()
+                    os.fsync(strm_file.fileno())
+        except OSError as err:
+            logger.error(f"创建strm源文件失败：{relative_path} - {err}")
+            self.failed.append(relative_path)
+            return
+        self._pending.append((tmp_name, relative_path))
+        if len(self._pending) >= self._batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        touched_dirs: Set[Path] = set()
+        copied = 0
+        for tmp_name, relative_path in self._pending:
+            tmp_path = self._tmp_dir / tmp_name
+            target = self._directory / relative_path
+            try:
+                if target.parent not in self._ready_dirs:
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    self._ready_dirs.add(target.parent)
+                if not self.move(tmp_path, target):
+                    copied += 1
+            except OSError as err:
+                logger.error(f"创建strm源文件失败：{relative_path} - {err}")
+                self.failed.append(relative_path)
+                tmp_path.unlink(missing_ok=True)
+                continue
+            touched_dirs.add(target.parent)
+            self.written.append(relative_path)
+            logger.debug(f"ANi-Strm创建成功：{relative_path}")
+        if copied:
+            logger.warning(f"ANi-Strm临时目录与目标目录不在同一文件系统，{copied}个strm改为复制写入，不再是原子替换")
+        if self._fsync:
+            for directory in touched_dirs:
+                self._fsync_directory(directory)
+        self._pending = []
+
+    def close(self):
+        self.flush()
+        if self._tmp_ready:
+            try:
+                self._tmp_dir.rmdir()
+            except OSError:
+                pass
+            self._tmp_ready = False
+
+    @staticmethod
+    def move(src: Path, dst: Path) -> bool:
+        """
+        :return: 是否为原子重命名，跨文件系统时回退为复制后删除并返回 False
+        """
+        try:
+            os.replace(src, dst)
+            return True
+        except OSError as err:
+            if err.errno != errno.EXDEV:
+                raise
+            shutil.move(str(src), str(dst))
+            return False
+
+    @staticmethod
+    def _fsync_directory(directory: Path):
+        try:
+            fd = os.open(directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+
+class FolderStreamParser:
+    """
+    增量解析目录响应中的 files 数组，每收到一段数据就产出已完整的文件信息
+    """
+
+    _FILES_PATTERN = re.compile(r'"files"\s*:\s*\[')
+    _TOKEN_PATTERN = re.compile(r'"nextPageToken"\s*:\s*(null|"(?:[^"\\]|\\.)*")')
+
+    def __init__(self):
+        self._json_decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._in_array = False
+        self.finished = False
+        self.next_page_token: Optional[str] = None
+
+    def feed(self, chunk: bytes) -> Iterator[Dict[str, Any]]:
+        self._buffer += self._text_decoder.decode(chunk)
+        return self._drain()
+
+    def close(self):
+        self._buffer += self._text_decoder.decode(b"", final=True)
+        for _ in self._drain():
+            pass
+        if not self.finished:
+            raise ValueError("目录响应不完整，未读取到 files 数组结尾")
+        self._capture_token(self._buffer)
+
+    def _capture_token(self, text: str):
+        match = self._TOKEN_PATTERN.search(text)
+        if match:
+            self.next_page_token = json.loads(match.group(1))
+
+    def _drain(self) -> Iterator[Dict[str, Any]]:
+        if self.finished:
+            return
+        if not self._in_array:
+            match = self._FILES_PATTERN.search(self._buffer)
+            if not match:
+                return
+            self._capture_token(self._buffer[: match.start()])
+            self._buffer = self._buffer[match.end():]
+            self._in_array = True
+
+        buffer = self._buffer
+        pos = 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= len(buffer):
+                break
+            if buffer[pos] == "]":
+                self.finished = True
+                pos += 1
+                break
+            try:
+                item, pos = self._json_decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                break
+            if isinstance(item, dict):
+                yield item
+        self._buffer = buffer[pos:]
+
+
+class SeasonRootIndex:
+    """
+    根目录解析结果：按时间倒序排列的季度、最新季度以及各季度文件夹元数据
+    """
+
+    FOLDER_MIME_TYPE = "application/vnd.google-apps.folder"
+
+    def __init__(self, folders: Dict[str, Dict[str, Any]]):
+        self.folders = folders
+        self.seasons: List[str] = sorted(folders, key=self.parse_season, reverse=True)
+        self.latest: Optional[str] = self.seasons[0] if self.seasons else None
+        self.built_at = time.time()
+
+    @staticmethod
+    def parse_season(name: str) -> Optional[Tuple[int, int]]:
+        parts = name.split("-", 1)
+        if len(parts) != 2 or not parts[0].isdigit() or not parts[1].isdigit():
+            return None
+        return int(parts[0]), int(parts[1])
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any]) -> "SeasonRootIndex":
+        folders = {}
+        for file_info in payload.get("files") or []:
+            name = file_info.get("name") or ""
+            if file_info.get("mimeType") != cls.FOLDER_MIME_TYPE or not cls.parse_season(name):
+                continue
+            folders[name] = file_info
+        return cls(folders)
+
+
+class FolderResponseCache:
+    """
+    目录响应缓存：按URL落盘，TTL内直接复用，过期后携带 ETag/Last-Modified 发起条件请求
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = None, ttl: int = 300):
+        self._cache_dir = cache_dir
+        self._ttl = ttl
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def ttl(self) -> int:
+        return self._ttl
+
+    def set_cache_dir(self, cache_dir: Optional[Path]):
+        with self._lock:
+            if cache_dir != self._cache_dir:
+                self._entries = {}
+            self._cache_dir = cache_dir
+
+    def _entry_path(self, url: str) -> Optional[Path]:
+        if not self._cache_dir:
+            return None
+        return self._cache_dir / f"{hashlib.sha1(url.encode('utf-8')).hexdigest()}.json"
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                return entry
+            path = self._entry_path(url)
+            if not path or not path.exists():
+                return None
+            try:
+                entry = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as err:
+                logger.debug(f"ANi-Strm读取目录缓存失败：{path} - {err}")
+                return None
+            if entry.get("url") != url:
+                return None
+            self._entries[url] = entry
+            return entry
+
+    def is_fresh(self, entry: Dict[str, Any]) -> bool:
+        return time.time() - (entry.get("fetched_at") or 0) < self._ttl
+
+    def put(self, url: str, payload: Dict[str, Any], etag: Optional[str] = None, last_modified: Optional[str] = None):
+        entry = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": time.time(),
+            "payload": payload,
+        }
+        with self._lock:
+            self._entries[url] = entry
+            self._write(url, entry)
+
+    def touch(self, url: str):
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                return
+            entry["fetched_at"] = time.time()
+            self._write(url, entry)
+
+    def _write(self, url: str, entry: Dict[str, Any]):
+        path = self._entry_path(url)
+        if not path:
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(entry, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp_path, path)
+        except OSError as err:
+            logger.debug(f"ANi-Strm写入目录缓存失败：{path} - {err}")
+
+    @staticmethod
+    def conditional_headers(entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        if not entry:
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+
+class SeasonManifestStore:
+    """
+    季度清单：记录上次处理过的文件名、远端修改时间和大小，用于增量比对
+    """
+
+    def __init__(self, plugin: _PluginBase):
+        self._plugin = plugin
+
+    @staticmethod
+    def _data_key(season: str) -> str:
+        return f"manifest_{season}"
+
+    def load(self, season: str, storage_path: str, layout: str = StrmLayout.FLAT) -> Dict[str, List[Any]]:
+        data = self._plugin.get_data(self._data_key(season)) or {}
+        if data.get("storage") != storage_path or (data.get("layout") or StrmLayout.FLAT) != layout:
+            return {}
+        return data.get("files") or {}
+
+    def save(self, season: str, entries: Dict[str, List[Any]], storage_path: str, layout: str = StrmLayout.FLAT):
+        self._plugin.save_data(
+            self._data_key(season),
+            {
+                "storage": storage_path,
+                "layout": layout,
+                "updated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "files": entries,
+            },
+        )
+
+    @staticmethod
+    def build_entry(file_info: Dict[str, Any]) -> List[Any]:
+        return [file_info.get("modifiedTime"), file_info.get("size")]
+
+
+class RunMetrics:
+    """
+    运行指标：记录本次任务各季度的目录请求耗时、错误次数、下载字节数与文件处理结果，
+    任务结束后汇总为一条运行记录
+    """
+
+    LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0)
+    _SEASON_PATTERN = re.compile(r"/(\d{4}-\d{1,2})/?$")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started_at: Optional[float] = None
+        self._seasons: Dict[str, Dict[str, Any]] = {}
+        self._histogram: List[int] = []
+        self.start_run()
+
+    @classmethod
+    def histogram_labels(cls) -> List[str]:
+        labels = [f"≤{int(bound * 1000)}ms" for bound in cls.LATENCY_BUCKETS]
+        labels.append(f">{int(cls.LATENCY_BUCKETS[-1] * 1000)}ms")
+        return labels
+
+    @classmethod
+    def season_of(cls, url: str) -> str:
+        match = cls._SEASON_PATTERN.search(urlparse(url).path)
+        return match.group(1) if match else "root"
+
+    def start_run(self):
+        with self._lock:
+            self._started_at = time.time()
+            self._seasons = {}
+            self._histogram = [0] * (len(self.LATENCY_BUCKETS) + 1)
+
+    def _season(self, season: str) -> Dict[str, Any]:
+        stats = self._seasons.get(season)
+        if stats is None:
+            stats = self._seasons[season] = {
+                "season": season,
+                "requests": 0,
+                "errors": 0,
+                "fetch_time": 0.0,
+                "max_latency": 0.0,
+                "bytes": 0,
+            }
+        return stats
+
+    def record_request(self, url: str, elapsed: float, nbytes: int = 0):
+        bucket = next(
+            (idx for idx, bound in enumerate(self.LATENCY_BUCKETS) if elapsed <= bound), len(self.LATENCY_BUCKETS)
+        )
+        with self._lock:
+            stats = self._season(self.season_of(url))
+            stats["requests"] += 1
+            stats["fetch_time"] += elapsed
+            stats["max_latency"] = max(stats["max_latency"], elapsed)
+            stats["bytes"] += nbytes
+            self._histogram[bucket] += 1
+
+    def record_error(self, url: str):
+        with self._lock:
+            self._season(self.season_of(url))["errors"] += 1
+
+    def add_bytes(self, season: str, nbytes: int):
+        with self._lock:
+            self._season(season)["bytes"] += nbytes
+
+    def record_season(self, season: str, stats: Dict[str, int], duration: float):
+        with self._lock:
+            self._season(season).update(stats, duration=duration)
+
+    def finish_run(self, request_stats: Dict[str, int], mirrors: List[Dict[str, Any]]) -> Dict[str, Any]:
+        with self._lock:
+            seasons = [
+                {
+                    **stats,
+                    "fetch_time": round(stats["fetch_time"], 3),
+                    "max_latency": round(stats["max_latency"], 3),
+                    "duration": round(stats.get("duration", 0.0), 3),
+                }
+                for stats in self._seasons.values()
+            ]
+            histogram = list(self._histogram)
+            started_at = self._started_at or time.time()
+        return {
+            "started_at": datetime.fromtimestamp(started_at).strftime("%Y-%m-%d %H:%M:%S"),
+            "wall_time": round(time.time() - started_at, 3),
+            "requests": sum(item["requests"] for item in seasons),
+            "bytes": sum(item["bytes"] for item in seasons),
+            "total": sum(item.get("total", 0) for item in seasons),
+            "created": sum(item.get("created", 0) for item in seasons),
+            "exists": sum(item.get("exists", 0) for item in seasons),
+            "failed": sum(item.get("failed", 0) for item in seasons),
+            "pruned": sum(item.get("pruned", 0) for item in seasons),
+            "retries": request_stats.get("retries", 0),
+            "request_failures": request_stats.get("failures", 0),
+            "short_circuits": request_stats.get("short_circuits", 0),
+            "latency_histogram": dict(zip(self.histogram_labels(), histogram)),
+            "seasons": seasons,
+            "mirrors": mirrors,
+        }
+
+
+class AdaptiveSchedule:
+    """
+    自适应调度：按季度统计新剧集出现的小时分布，在常见更新时段内高频检查；
+    记录足够的季度在时段外等到下一个时段（最长不超过空闲间隔），记录不足时每小时检查一次，
+    长期无更新的往季每天检查一次
+    """
+
+    HOT_INTERVAL = timedelta(minutes=10)
+    ACTIVE_INTERVAL = timedelta(hours=1)
+    # 累计记录到这么多个新文件后才信任统计出的更新时段
+    MIN_HISTORY = 8
+    FINISHED_INTERVAL = timedelta(days=1)
+    # 超过该天数没有新文件的往季视为已完结
+    FINISHED_AFTER = timedelta(days=14)
+    # 出现次数达到最大值该比例的小时记为更新时段
+    HOT_RATIO = 0.25
+
+    def __init__(self, plugin: _PluginBase, tz: str, idle_interval: timedelta = timedelta(hours=6)):
+        self._plugin = plugin
+        self._tz = pytz.timezone(tz)
+        self._idle_interval = max(idle_interval, self.ACTIVE_INTERVAL)
+
+    @staticmethod
+    def _data_key(season: str) -> str:
+        return f"activity_{season}"
+
+    def now(self) -> datetime:
+        return datetime.now(tz=self._tz)
+
+    def local_season(self, now: Optional[datetime] = None) -> str:
+        now = now or self.now()
+        return f"{now.year}-{((now.month - 1) // 3) * 3 + 1}"
+
+    def load(self, season: str) -> Dict[str, Any]:
+        data = self._plugin.get_data(self._data_key(season)) or {}
+        hours = data.get("hours") or []
+        return {
+            "hours": hours if len(hours) == 24 else [0] * 24,
+            "last_new_at": data.get("last_new_at"),
+        }
+
+    def record(self, season: str, modified_times: List[Optional[str]]):
+        """
+        记录本次新出现文件的小时分布，优先使用远端修改时间，缺失时按发现时间计
+        """
+        if not modified_times:
+            return
+        now = self.now()
+        activity = self.load(season)
+        latest = None
+        for modified_time in modified_times:
+            appeared_at = self._parse_time(modified_time) or now
+            activity["hours"][appeared_at.hour] += 1
+            latest = appeared_at if latest is None else max(latest, appeared_at)
+        last_new_at = self._parse_time(activity["last_new_at"])
+        if last_new_at is None or latest > last_new_at:
+            activity["last_new_at"] = latest.isoformat()
+        self._plugin.save_data(self._data_key(season), activity)
+
+    def _parse_time(self, value: Optional[str]) -> Optional[datetime]:
+        if not value:
+            return None
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        if parsed.tzinfo is None:
+            parsed = self._tz.localize(parsed)
+        return parsed.astimezone(self._tz)
+
+    def hot_hours(self, season: str) -> Set[int]:
+        return self._hot_hours(self.load(season)["hours"])
+
+    def _hot_hours(self, hours: List[int]) -> Set[int]:
+        peak = max(hours)
+        if not peak:
+            return set()
+        return {hour for hour, count in enumerate(hours) if count >= max(1.0, peak * self.HOT_RATIO)}
+
+    def is_finished(self, season: str, now: Optional[datetime] = None) -> bool:
+        now = now or self.now()
+        if season == self.local_season(now):
+            return False
+        last_new_at = self._parse_time(self.load(season)["last_new_at"])
+        return last_new_at is None or now - last_new_at >= self.FINISHED_AFTER
+
+    def next_run(self, seasons: List[str], now: Optional[datetime] = None) -> datetime:
+        now = now or self.now()
+        if not seasons:
+            return now + self.ACTIVE_INTERVAL
+        return min(self._next_season_run(season, now) for season in seasons)
+
+    def _next_season_run(self, season: str, now: datetime) -> datetime:
+        if self.is_finished(season, now):
+            return now + self.FINISHED_INTERVAL
+        hours = self.load(season)["hours"]
+        hot_hours = self._hot_hours(hours)
+        # 更新时段及其后一小时内高频检查，兼容上传延迟
+        window = hot_hours | {(hour + 1) % 24 for hour in hot_hours}
+        if now.hour in window:
+            return now + self.HOT_INTERVAL
+        # 记录足够时时段外不再每小时检查，只保留空闲间隔兜底偶尔的时段外更新
+        idle = self._idle_interval if sum(hours) >= self.MIN_HISTORY else self.ACTIVE_INTERVAL
+        next_run = now + idle
+        for offset in range(1, 24):
+            hour_start = (now + timedelta(hours=offset)).replace(minute=0, second=0, microsecond=0)
+            if hour_start >= next_run:
+                break
+            if hour_start.hour in window:
+                return hour_start
+        return next_run
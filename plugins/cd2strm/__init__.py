@@ -1,10 +1,15 @@
+import errno
+import hashlib
 import os
 import shutil
+import sqlite3
 import threading
 import time
+import types
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from time import sleep
-from typing import List, Tuple, Dict, Any
+from typing import List, Tuple, Dict, Any, Iterable, Optional, Callable
 
 import pytz
 from apscheduler.schedulers.background import BackgroundScheduler
@@ -12,7 +17,6 @@ from apscheduler.schedulers.background import BackgroundScheduler
 from app.core.config import settings
 from app.core.context import MediaInfo
 from app.core.event import eventmanager, Event
-from app.core.meta import MetaBase
 from app.core.metainfo import MetaInfo
 from app.db import get_db
 from app.db.models.transferhistory import TransferHistory
@@ -24,6 +28,442 @@ from app.schemas import TransferInfo, Notification, WebhookEventInfo
 from app.schemas.types import EventType, MediaType, NotificationType
 
 lock = threading.Lock()
+# 同一时间只允许一个批量上传任务
+upload_lock = threading.Lock()
+
+
+class BandwidthLimiter:
+    """
+    令牌桶限速：所有上传线程共用一个桶，限制总上传速度；
+    可按小时段设置不同速度，例如 0-7:0,19-23:2048 表示0点到7点不限速、19点到23点限速2048KB/s
+    """
+
+    def __init__(self, rate_kb: int = 0, windows: str = '', tz: str = None):
+        self.default_rate = max(0, rate_kb) * 1024
+        self._tz = pytz.timezone(tz) if tz else None
+        # 每小时对应的速度（字节/秒），0 表示不限速
+        self._hour_rates = [self.default_rate] * 24
+        for hours, rate in self.parse_windows(windows):
+            for hour in hours:
+                self._hour_rates[hour] = rate
+        self._lock = threading.Lock()
+        self._rate = None
+        self._tokens = 0.0
+        self._last = time.monotonic()
+
+    @staticmethod
+    def parse_windows(windows: str) -> List[Tuple[List[int], int]]:
+        result = []
+        for item in (windows or '').replace('，', ',').replace('\n', ',').split(','):
+            item = item.strip()
+            if not item:
+                continue
+            try:
+                hours, rate = item.split(':', 1)
+                start, end = (int(h) for h in hours.split('-', 1)) if '-' in hours else (int(hours),) * 2
+                if not (0 <= start <= 23 and 0 <= end <= 23):
+                    raise ValueError(hours)
+                # 支持跨零点，例如 22-2
+                span = list(range(start, end + 1)) if start <= end else list(range(start, 24)) + list(range(0, end + 1))
+                result.append((span, max(0, int(rate)) * 1024))
+            except ValueError:
+                logger.warning(f'无法解析上传限速时段 {item}，格式应为 开始小时-结束小时:速度KB/s')
+        return result
+
+    @property
+    def enabled(self) -> bool:
+        return any(self._hour_rates)
+
+    def current_rate(self) -> int:
+        return self._hour_rates[datetime.now(tz=self._tz).hour]
+
+    def chunk_size(self, chunk_size: int) -> int:
+        """
+        限速时每次最多复制约 1 秒的数据量，避免一次写入大块后长时间停顿
+        """
+        rate = self.current_rate()
+        return min(chunk_size, max(64 * 1024, rate)) if rate else chunk_size
+
+    def consume(self, size: int):
+        """
+        取走 size 字节的令牌，不足时等待；令牌可以透支，由后续调用补齐等待时间
+        """
+        rate = self.current_rate()
+        if not rate:
+            self._rate = None
+            return
+        with self._lock:
+            now = time.monotonic()
+            if rate != self._rate:
+                # 进入新的时段，重新装满令牌桶
+                self._rate, self._tokens = rate, float(rate)
+            else:
+                self._tokens = min(float(rate), self._tokens + (now - self._last) * rate)
+            self._last = now
+            self._tokens -= size
+            wait = -self._tokens / rate if self._tokens < 0 else 0
+        if wait:
+            sleep(wait)
+
+
+class ChunkedCopier:
+    """
+    分块复制：先写入同目录的 .part 临时文件，中断后从已写入的位置续传，
+    校验大小（可选校验哈希）后再重命名为目标文件
+    """
+    PART_SUFFIX = '.part'
+    # 内核不支持零拷贝时返回的错误码，遇到后回退到分块读写
+    FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EOPNOTSUPP, errno.EINVAL, errno.EBADF, errno.ENOTSUP}
+
+    def __init__(self, chunk_size: int = 8 * 1024 * 1024, verify_hash: bool = False, zero_copy: bool = True,
+                 limiter: Optional[BandwidthLimiter] = None):
+        self.chunk_size = max(64 * 1024, chunk_size)
+        self.verify_hash = verify_hash
+        self.limiter = limiter if limiter and limiter.enabled else None
+        # 依次尝试的零拷贝方式，某种方式不被支持后不再使用；多个上传线程共用，修改时加锁
+        self._zero_copy_methods = [name for name in ('copy_file_range', 'sendfile')
+                                   if zero_copy and hasattr(os, name)]
+        self._methods_lock = threading.Lock()
+
+    def copy(self, src: str, dst: str) -> Dict[str, Any]:
+        part = dst + self.PART_SUFFIX
+        src_size = os.path.getsize(src)
+        offset = os.path.getsize(part) if os.path.exists(part) else 0
+        if offset > src_size:
+            # 临时文件比源文件还大，说明源文件已变化，重新复制
+            offset = 0
+        if offset:
+            logger.info(f'检测到未完成的上传，从 {offset / 1024 / 1024:.1f}MB 处续传 {dst}')
+
+        started = time.monotonic()
+        with open(src, 'rb') as src_file, open(part, 'r+b' if offset else 'wb') as part_file:
+            part_file.truncate(offset)
+            src_file.seek(offset)
+            part_file.seek(offset)
+            self._copy_range(src_file, part_file, src_size - offset)
+        elapsed = time.monotonic() - started
+
+        part_size = os.path.getsize(part)
+        if part_size != src_size:
+            raise IOError(f'上传后大小不一致，source={src_size}，dest={part_size}')
+        if self.verify_hash and self.file_hash(src) != self.file_hash(part):
+            os.remove(part)
+            raise IOError('上传后哈希校验失败，已删除临时文件')
+        os.replace(part, dst)
+        try:
+            shutil.copystat(src, dst)
+        except OSError:
+            pass
+
+        copied = src_size - offset
+        speed = copied / 1024 / 1024 / elapsed if elapsed > 0 else 0.0
+        return {'bytes': copied, 'elapsed': elapsed, 'speed': speed, 'resumed_from': offset}
+
+    def _copy_range(self, src_file, dst_file, length: int):
+        remaining = length
+        if self._zero_copy_methods and remaining > 0:
+            remaining -= self._zero_copy(src_file, dst_file, remaining)
+        while remaining > 0:
+            chunk = src_file.read(min(self._step(), remaining))
+            if not chunk:
+                break
+            dst_file.write(chunk)
+            remaining -= len(chunk)
+            if self.limiter:
+                self.limiter.consume(len(chunk))
+
+    def _step(self) -> int:
+        return self.limiter.chunk_size(self.chunk_size) if self.limiter else self.chunk_size
+
+    def _zero_copy(self, src_file, dst_file, length: int) -> int:
+        """
+        使用 copy_file_range / sendfile 在内核中复制，返回已复制的字节数；
+        中途不被支持时把文件位置同步回 Python 文件对象，由调用方继续分块复制
+        """
+        dst_file.flush()
+        src_fd, dst_fd = src_file.fileno(), dst_file.fileno()
+        src_pos, dst_pos = src_file.tell(), dst_file.tell()
+        copied = 0
+        while copied < length:
+            method = self._next_zero_copy_method()
+            if not method:
+                break
+            count = min(self._step(), length - copied)
+            try:
+                if method == 'copy_file_range':
+                    sent = os.copy_file_range(src_fd, dst_fd, count, src_pos + copied, dst_pos + copied)
+                else:
+                    os.lseek(dst_fd, dst_pos + copied, os.SEEK_SET)
+                    sent = os.sendfile(dst_fd, src_fd, src_pos + copied, count)
+            except OSError as err:
+                if err.errno not in self.FALLBACK_ERRNOS:
+                    raise
+                sent = 0
+            if not sent:
+                # 返回 0 或不支持时换下一种方式
+                logger.debug(f'{method} 不可用，回退到其他复制方式')
+                self._disable_zero_copy_method(method)
+                continue
+            copied += sent
+            if self.limiter:
+                self.limiter.consume(sent)
+        src_file.seek(src_pos + copied)
+        dst_file.seek(dst_pos + copied)
+        return copied
+
+    def _next_zero_copy_method(self) -> Optional[str]:
+        with self._methods_lock:
+            return self._zero_copy_methods[0] if self._zero_copy_methods else None
+
+    def _disable_zero_copy_method(self, method: str):
+        # 按名称移除，其他线程可能已经移除过同一方式
+        with self._methods_lock:
+            if method in self._zero_copy_methods:
+                self._zero_copy_methods.remove(method)
+
+    def file_hash(self, path: str) -> str:
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(self.chunk_size), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+
+class PathClassifier:
+    """
+    路径分类：按路径层级构建前缀树，一次遍历即可判断路径属于哪个本地媒体库或cd2挂载目录，
+    支持多组 本地前缀#网盘前缀 映射
+    """
+    LOCAL = 'local'
+    CLOUD = 'cloud'
+
+    def __init__(self, mappings: List[Tuple[str, str]], exclude_keywords: Iterable[str] = ()):
+        self._mappings = [(local, cloud) for local, cloud in mappings if local and cloud]
+        self._exclude_keywords = [keyword for keyword in exclude_keywords if keyword]
+        self._root: Dict[str, Any] = {}
+        for local, cloud in self._mappings:
+            self._insert(local, (self.LOCAL, local, cloud))
+            self._insert(cloud, (self.CLOUD, cloud, local))
+
+    @classmethod
+    def from_config(cls, local_prefix: str, cloud_prefix: str, extra_mappings: str = '',
+                    exclude_keywords: str = '') -> 'PathClassifier':
+        mappings = [(local_prefix, cloud_prefix)]
+        for line in (extra_mappings or '').splitlines():
+            if '#' not in line:
+                continue
+            local, cloud = line.split('#', 1)
+            mappings.append((local.strip(), cloud.strip()))
+        keywords = [keyword.strip() for keyword in (exclude_keywords or '').replace('，', ',').split(',')]
+        return cls(mappings, exclude_keywords=keywords)
+
+    @staticmethod
+    def _parts(path: str) -> List[str]:
+        return [part for part in path.replace('\\', '/').split('/') if part]
+
+    def _insert(self, prefix: str, value: Tuple[str, str, str]):
+        node = self._root
+        for part in self._parts(prefix):
+            node = node.setdefault(part, {})
+        # 同一前缀重复配置时以先配置的为准
+        node.setdefault('', value)
+
+    def match(self, path: str) -> Optional[Tuple[str, str, str]]:
+        """
+        :return: (类型, 命中的前缀, 对应的另一侧前缀)，取最长的匹配
+        """
+        node = self._root
+        matched = node.get('')
+        for part in self._parts(path):
+            node = node.get(part)
+            if node is None:
+                break
+            matched = node.get('', matched)
+        return matched
+
+    def is_cloud(self, path: str, check_keywords: bool = True) -> bool:
+        matched = self.match(path)
+        if not matched or matched[0] != self.CLOUD:
+            return False
+        return not (check_keywords and any(keyword in path for keyword in self._exclude_keywords))
+
+    def to_cloud(self, path: str) -> Optional[str]:
+        """
+        本地媒体库路径转换为cd2挂载路径，不在任何本地前缀下时返回 None
+        """
+        matched = self.match(path)
+        if not matched or matched[0] != self.LOCAL:
+            return None
+        local, cloud = matched[1], matched[2]
+        relative = self._parts(path)[len(self._parts(local)):]
+        return '/'.join([cloud.rstrip('/')] + relative)
+
+
+class UploadJobStore:
+    """
+    上传任务表：以转移记录ID为主键保存任务状态、尝试次数和时间，
+    每次状态变更都是独立事务，进程中断后不会丢失或重复
+    """
+    WAITING = 'waiting'
+    UPLOADED = 'uploaded'
+    # 非追更剧，上传后立即删除本地并生成strm
+    IMMEDIATE = 'immediate'
+
+    def __init__(self, db_path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS upload_jobs ('
+            'history_id INTEGER PRIMARY KEY, '
+            'state TEXT NOT NULL, '
+            'attempts INTEGER NOT NULL DEFAULT 0, '
+            'created_at REAL NOT NULL, '
+            'updated_at REAL NOT NULL, '
+            'last_error TEXT)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_upload_jobs_state ON upload_jobs (state, created_at)')
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _execute_many(self, sql: str, rows: List[tuple]) -> int:
+        if not rows:
+            return 0
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                changed = self._conn.executemany(sql, rows).rowcount
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+        return changed
+
+    def enqueue(self, ids: Iterable[int], state: str = WAITING) -> List[int]:
+        """
+        加入任务表，已存在的ID保持原状态，返回新加入的ID
+        """
+        now = time.time()
+        added = []
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                for id in dict.fromkeys(ids):
+                    cursor = self._conn.execute(
+                        'INSERT OR IGNORE INTO upload_jobs (history_id, state, created_at, updated_at) '
+                        'VALUES (?, ?, ?, ?)', (id, state, now, now))
+                    if cursor.rowcount:
+                        added.append(id)
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+        return added
+
+    def contains(self, id: int) -> bool:
+        with self._lock:
+            return self._conn.execute('SELECT 1 FROM upload_jobs WHERE history_id = ?', (id,)).fetchone() is not None
+
+    def list_ids(self, state: str) -> List[int]:
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT history_id FROM upload_jobs WHERE state = ? ORDER BY created_at, history_id', (state,))
+            return [row[0] for row in rows]
+
+    def mark_uploaded(self, ids: Iterable[int]) -> int:
+        now = time.time()
+        return self._execute_many(
+            'UPDATE upload_jobs SET state = ?, attempts = attempts + 1, updated_at = ?, last_error = NULL '
+            'WHERE history_id = ?', [(self.UPLOADED, now, id) for id in ids])
+
+    def mark_failed(self, ids: Iterable[int], error: str = None, state: str = None) -> int:
+        """
+        记录失败次数与原因，指定 state 时同时转入该状态
+        """
+        now = time.time()
+        if state:
+            return self._execute_many(
+                'UPDATE upload_jobs SET state = ?, attempts = attempts + 1, updated_at = ?, last_error = ? '
+                'WHERE history_id = ?', [(state, now, error, id) for id in ids])
+        return self._execute_many(
+            'UPDATE upload_jobs SET attempts = attempts + 1, updated_at = ?, last_error = ? WHERE history_id = ?',
+            [(now, error, id) for id in ids])
+
+    def remove(self, ids: Iterable[int]) -> int:
+        return self._execute_many('DELETE FROM upload_jobs WHERE history_id = ?', [(id,) for id in ids])
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._conn.execute('SELECT state, COUNT(*) FROM upload_jobs GROUP BY state').fetchall())
+
+
+class UploadDispatcher:
+    """
+    上传调度合并：收集待上传的转移记录ID，静默期内没有新ID、等待超过上限或累计达到阈值时，
+    只注册一个批量上传任务，避免一次入库产生大量定时任务
+    """
+
+    def __init__(self, scheduler: BackgroundScheduler, callback: Callable[[List[int]], None], job_id: str,
+                 name: str, quiet_period: timedelta, max_wait: timedelta, batch_size: Optional[int] = None):
+        self._scheduler = scheduler
+        self._callback = callback
+        self._job_id = job_id
+        self._name = name
+        self._quiet_period = quiet_period
+        self._max_wait = max(max_wait, quiet_period)
+        self._batch_size = batch_size
+        self._lock = threading.Lock()
+        # 同一调度器的批量上传依次执行：执行期间到期的任务只做标记，由正在执行的任务接着处理
+        self._running = False
+        self._rerun = False
+        self._pending: Dict[int, None] = {}
+        self._first_at: Optional[datetime] = None
+
+    def submit(self, ids: Iterable[int]):
+        now = datetime.now(tz=pytz.timezone(settings.TZ))
+        with self._lock:
+            for id in ids:
+                self._pending[id] = None
+            if not self._pending:
+                return
+            if self._first_at is None:
+                self._first_at = now
+            if self._batch_size and len(self._pending) >= self._batch_size:
+                run_date = now
+            else:
+                # 超过等待上限时立即执行，不能注册过去的时间，否则会被当作错过的任务丢弃
+                run_date = max(now, min(now + self._quiet_period, self._first_at + self._max_wait))
+            # 上传期间到期的任务需要进入 _flush 留下标记，不能因 max_instances 或错过执行时间被丢弃
+            self._scheduler.add_job(func=self._flush, trigger='date', run_date=run_date, id=self._job_id,
+                                    replace_existing=True, name=self._name, max_instances=2,
+                                    misfire_grace_time=None)
+        logger.debug(f"{self._name}：待处理={len(self._pending)}，计划执行时间={run_date}")
+
+    def _flush(self):
+        with self._lock:
+            if self._running:
+                self._rerun = True
+                return
+            self._running = True
+        try:
+            while True:
+                with self._lock:
+                    ids = list(self._pending)
+                    self._pending.clear()
+                    self._first_at = None
+                    self._rerun = False
+                if ids:
+                    self._callback(ids)
+                with self._lock:
+                    if not self._rerun:
+                        self._running = False
+                        return
+        except Exception:
+            with self._lock:
+                self._running = False
+            raise
 
 
 class Cd2Strm(_PluginBase):
@@ -34,7 +474,7 @@ class Cd2Strm(_PluginBase):
     # 插件图标
     plugin_icon = "https://raw.githubusercontent.com/honue/MoviePilot-Plugins/main/icons/clouddrive.png"
     # 插件版本
-    plugin_version = "0.0.5"
+    plugin_version = "0.0.15"
     # 插件作者
     plugin_author = "honue"
     # 作者主页
@@ -47,24 +487,46 @@ class Cd2Strm(_PluginBase):
     auth_level = 1
 
     _enable = True
-    _cron = '20'
-    _save_days = '3'
+    _cron = 20
+    _save_days = 3
     _onlyonce = False
     _cleanlocal = False
+    # 并发上传线程数，同一目标文件夹内按顺序上传
+    _upload_workers = 2
+    # 非追更剧合并上传：静默秒数与触发数量
+    _upload_quiet_seconds = 30
+    _upload_batch_size = 20
+    # 分块复制的块大小（MB）
+    _copy_chunk_mb = 8
+    _verify_hash = False
+    _zero_copy = True
+    # 上传限速（KB/s，0为不限速）与按小时段的限速
+    _upload_rate_limit = 0
+    _upload_bandwidth_windows = ''
+    _copier = ChunkedCopier()
 
     # 链接前缀
     _local_media_prefix_path = '/strm/'
     # cd2挂载本地媒体库前缀
     _cd_mount_prefix_path = '/CloudNAS/115/emby/'
+    # 额外的路径映射，每行一组 本地前缀#网盘前缀
+    _path_mappings = ''
+    # 路径包含这些关键词时不视为网盘文件
+    _cloud_exclude_keywords = '转存'
 
     _scheduler = None
 
     _subscribe_oper = SubscribeOper()
     _history_oper = TransferHistoryOper()
 
+    # 旧版本保存在插件数据中的队列，启动时迁移到任务表
     _data_key_waiting_upload = "waiting_upload_list_id"
     _data_key_uploaded = "uploaded_list_id"
 
+    _job_store = None
+    _queue_dispatcher = None
+    _immediate_dispatcher = None
+
     def init_plugin(self, config: dict = None):
         if config:
             self._enable = config.get('enable', False)
@@ -72,16 +534,50 @@ class Cd2Strm(_PluginBase):
             self._save_days: int = int(config.get('save_days', '3'))
             self._onlyonce = config.get('onlyonce', False)
             self._cleanlocal = config.get('cleanlocal', False)
+            self._upload_workers = self._parse_int(config.get('upload_workers'), 2)
+            self._upload_quiet_seconds = self._parse_int(config.get('upload_quiet_seconds'), 30)
+            self._upload_batch_size = self._parse_int(config.get('upload_batch_size'), 20)
+            self._copy_chunk_mb = self._parse_int(config.get('copy_chunk_mb'), 8)
+            self._verify_hash = config.get('verify_hash', False)
+            zero_copy = config.get('zero_copy')
+            self._zero_copy = True if zero_copy is None else zero_copy
+            self._upload_rate_limit = self._parse_int(config.get('upload_rate_limit'), 0)
+            self._upload_bandwidth_windows = config.get('upload_bandwidth_windows') or ''
+            limiter = BandwidthLimiter(rate_kb=self._upload_rate_limit, windows=self._upload_bandwidth_windows,
+                                       tz=settings.TZ)
+            self._copier = ChunkedCopier(chunk_size=self._copy_chunk_mb * 1024 * 1024,
+                                         verify_hash=self._verify_hash, zero_copy=self._zero_copy,
+                                         limiter=limiter)
             self._local_media_prefix_path = config.get('local_media_prefix_path', '/strm/')
             # 用于修改链接
             self._cd_mount_prefix_path = config.get('cd_mount_prefix_path', '/CloudNAS/CloudDrive/115/emby/')
+            self._path_mappings = config.get('path_mappings') or ''
+            self._cloud_exclude_keywords = config.get('cloud_exclude_keywords', '转存')
+
+        self._classifier = PathClassifier.from_config(self._local_media_prefix_path, self._cd_mount_prefix_path,
+                                                      extra_mappings=self._path_mappings,
+                                                      exclude_keywords=self._cloud_exclude_keywords)
 
         self.stop_service()
 
+        if not self._job_store:
+            self._job_store = UploadJobStore(str(self.get_data_path() / 'upload_jobs.db'))
+            self._migrate_legacy_queue()
+
         if not self._enable:
             return
 
         self._scheduler = BackgroundScheduler(timezone=settings.TZ)
+        self._queue_dispatcher = UploadDispatcher(
+            self._scheduler, callback=lambda ids: self.upload_task(), job_id='cd2strm_queue_upload',
+            name='cd2上传任务', quiet_period=timedelta(minutes=self._cron), max_wait=timedelta(minutes=self._cron * 2))
+        self._immediate_dispatcher = UploadDispatcher(
+            self._scheduler, callback=self._upload_immediately, job_id='cd2strm_immediate_upload',
+            name='cd2立即上传任务', quiet_period=timedelta(seconds=self._upload_quiet_seconds),
+            max_wait=timedelta(seconds=self._upload_quiet_seconds * 4), batch_size=self._upload_batch_size)
+        # 重启前未完成的任务重新调度
+        self._queue_dispatcher.submit(self._job_store.list_ids(UploadJobStore.WAITING))
+        self._immediate_dispatcher.submit(self._job_store.list_ids(UploadJobStore.IMMEDIATE))
 
         if self._onlyonce:
             self._scheduler.add_job(func=self.upload_task, trigger='date',
@@ -111,10 +607,39 @@ class Cd2Strm(_PluginBase):
             'save_days': self._save_days,
             'onlyonce': False,
             'cleanlocal': False,
+            'upload_workers': self._upload_workers,
+            'upload_quiet_seconds': self._upload_quiet_seconds,
+            'upload_batch_size': self._upload_batch_size,
+            'copy_chunk_mb': self._copy_chunk_mb,
+            'verify_hash': self._verify_hash,
+            'zero_copy': self._zero_copy,
+            'upload_rate_limit': self._upload_rate_limit,
+            'upload_bandwidth_windows': self._upload_bandwidth_windows,
             'local_media_prefix_path': self._local_media_prefix_path,
-            'cd_mount_prefix_path': self._cd_mount_prefix_path
+            'cd_mount_prefix_path': self._cd_mount_prefix_path,
+            'path_mappings': self._path_mappings,
+            'cloud_exclude_keywords': self._cloud_exclude_keywords
         })
 
+    def _migrate_legacy_queue(self):
+        waiting_ids = self.get_data(self._data_key_waiting_upload) or []
+        uploaded_ids = self.get_data(self._data_key_uploaded) or []
+        if not waiting_ids and not uploaded_ids:
+            return
+        self._job_store.enqueue(uploaded_ids, state=UploadJobStore.UPLOADED)
+        self._job_store.enqueue(waiting_ids)
+        self.del_data(self._data_key_waiting_upload)
+        self.del_data(self._data_key_uploaded)
+        logger.info(f"已迁移旧上传队列到任务表：待上传={len(waiting_ids)}，已上传={len(uploaded_ids)}")
+
+    @staticmethod
+    def _parse_int(value: Any, default: int) -> int:
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            return default
+        return value if value > 0 else default
+
     @eventmanager.register(EventType.TransferComplete)
     def update_waiting_upload_list(self, event: Event):
         transfer_info: TransferInfo = event.event_data.get('transferinfo', {})
@@ -122,139 +647,222 @@ class Cd2Strm(_PluginBase):
         logger.debug(f"转移文件明细：{transfer_info.file_list}")
         if not transfer_info.file_list_new:
             return
-        # 判断是不是网盘整理的剧,网盘剧跳过
-        isCloudFile = False
-        for source_file in transfer_info.file_list:
-            if self._cd_mount_prefix_path in source_file:
-                isCloudFile = True
-            if "转存" in source_file:
-                isCloudFile = False
-        with lock:
-            waiting_upload_list_id = self.get_data(self._data_key_waiting_upload) or []
-            uploaded_id_list = self.get_data(self._data_key_uploaded) or []
-            new_waiting_ids = []
-            new_waiting_sources = []
-            for source_file in transfer_info.file_list:
-                history: TransferHistory = self._history_oper.get_by_src(src=source_file)
-                if isCloudFile:
-                    logger.info(f"整理的是网盘文件 {history.src} ，不加入上传列表")
-                    self.del_dest_file(history.id)
-                    self.create_strm_task(history.id)
-                    return
-                else:
-                    # 判断段转移任务开始时间?新剧晚点上传 老剧立马上上传
-                    media_info: MediaInfo = event.event_data.get('mediainfo', {})
-                    meta: MetaBase = event.event_data.get("meta")
-
-                    if media_info:
-                        is_exist = self._subscribe_oper.exists(tmdbid=media_info.tmdb_id, doubanid=media_info.douban_id,
-                                                               season=media_info.season)
-                        if is_exist:
-                            logger.info(f'识别为追更剧，{self._cron}分钟后执行上传任务')
-                            try:
-                                if history.id in waiting_upload_list_id or history.id in uploaded_id_list:
-                                    continue
-                                if history.id in new_waiting_ids:
-                                    continue
-                                new_waiting_ids.append(history.id)
-                                new_waiting_sources.append(history.src)
-                            except Exception as err:
-                                logger.error(f"加入待上传队列失败，source={source_file}: {str(err)}")
-                        else:
-                            logger.info(f'识别为非追更剧，立即上传并生成Strm，source={source_file}')
-
-                            self._scheduler.add_job(func=self.upload_task, kwargs={"immediately_id": history.id},
-                                                    trigger='date',
-                                                    run_date=datetime.now(tz=pytz.timezone(settings.TZ)) + timedelta(
-                                                        seconds=5),
-                                                    name="cd2上传任务")
-
-            if new_waiting_ids:
-                waiting_upload_list_id.extend(new_waiting_ids)
-                # 去重
-                waiting_upload_list_id = list(dict.fromkeys(waiting_upload_list_id))
-                self.save_data(self._data_key_waiting_upload, waiting_upload_list_id)
-                logger.info(f'新入库文件加入待上传列表，数量={len(new_waiting_sources)}')
-                logger.debug(f'待上传源文件明细：{new_waiting_sources}')
-
-                self._scheduler.add_job(func=self.upload_task, trigger='date',
-                                        run_date=datetime.now(
-                                            tz=pytz.timezone(settings.TZ)) + timedelta(
-                                            minutes=self._cron),
-                                        name="cd2上传任务")
-                logger.info(f"已注册延迟上传任务，延迟={self._cron}分钟")
+        # 逐个文件判断：网盘文件直接生成strm，本地文件加入上传队列
+        cloud_sources = []
+        local_sources = []
+        for source_file in dict.fromkeys(transfer_info.file_list):
+            if self._classifier.is_cloud(source_file):
+                cloud_sources.append(source_file)
+            else:
+                local_sources.append(source_file)
+        histories = self._load_histories_by_src(transfer_info.file_list)
 
-            self._scheduler.start()
+        cloud_histories = []
+        for source_file in cloud_sources:
+            history: TransferHistory = histories.get(source_file)
+            if history is None:
+                logger.warning(f"{source_file} 转移记录不存在，跳过")
+                continue
+            logger.info(f"整理的是网盘文件 {history.src} ，不加入上传列表")
+            cloud_histories.append(history)
+        self._replace_with_strm(cloud_histories)
+
+        # 判断段转移任务开始时间?新剧晚点上传 老剧立马上上传
+        media_info: MediaInfo = event.event_data.get('mediainfo', {})
+        if not local_sources or not media_info:
+            logger.info(f"本次事件处理完成：网盘文件={len(cloud_sources)}，本地文件={len(local_sources)}")
+            return
+        is_exist = self._subscribe_oper.exists(tmdbid=media_info.tmdb_id, doubanid=media_info.douban_id,
+                                               season=media_info.season)
+        local_histories = []
+        for source_file in local_sources:
+            history: TransferHistory = histories.get(source_file)
+            if history is None:
+                logger.warning(f"{source_file} 转移记录不存在，跳过")
+                continue
+            local_histories.append(history)
+
+        # 整批一次写入任务表，已在队列中的记录自动忽略，由调度器合并为一次批量上传
+        local_ids = [history.id for history in local_histories]
+        if is_exist:
+            new_ids = self._job_store.enqueue(local_ids)
+            if new_ids:
+                logger.info(f'识别为追更剧，新入库文件加入待上传列表，数量={len(new_ids)}，'
+                            f'{self._cron}分钟内无新文件后执行上传任务')
+                logger.debug(f'待上传源文件明细：{[h.src for h in local_histories if h.id in new_ids]}')
+                self._queue_dispatcher.submit(new_ids)
+        else:
+            new_ids = self._job_store.enqueue(local_ids, state=UploadJobStore.IMMEDIATE)
+            if new_ids:
+                logger.info(f'识别为非追更剧，加入立即上传列表，数量={len(new_ids)}')
+                self._immediate_dispatcher.submit(new_ids)
+        logger.info(f"本次事件处理完成：网盘文件={len(cloud_sources)}，本地文件={len(local_histories)}")
 
     def upload_task(self, immediately_id: int = None):
         try:
             if immediately_id:
-                # 链接目录前缀 替换为 cd2挂载前缀
-                history: TransferHistory = self._history_oper.get(immediately_id)
-                cd2_dest = history.dest.replace(self._local_media_prefix_path, self._cd_mount_prefix_path)
-                if self._upload_file(local_source=history.src, cd2_dest=cd2_dest):
-                    logger.info(f'上传成功 {history.src} {cd2_dest}')
-                    self.del_dest_file(history.id)
-                    self.create_strm_task(history.id)
-                else:
-                    logger.error(f'上传失败 {history.src} {cd2_dest}')
+                self._upload_immediately([immediately_id])
                 return
-            with lock:
-                waiting_upload_id_list = self.get_data(self._data_key_waiting_upload) or []
-                uploaded_id_list = self.get_data(self._data_key_uploaded) or []
-                if not waiting_upload_id_list:
-                    logger.debug('没有需要上传的媒体文件')
-                    return
-                logger.info(f'开始执行上传任务 转移记录：{waiting_upload_id_list} ')
-                task_list = waiting_upload_id_list.copy()
-                total_num = len(waiting_upload_id_list)
-                for id in waiting_upload_id_list:
-                    # 链接目录前缀 替换为 cd2挂载前缀
-                    history: TransferHistory = self._history_oper.get(id)
-                    if history is None:
-                        logger.error(f"{id} 转移记录不存在")
-                        task_list.remove(id)
-                        continue
-                    cd2_dest = history.dest.replace(self._local_media_prefix_path, self._cd_mount_prefix_path)
-                    if self._upload_file(local_source=history.src, cd2_dest=cd2_dest):
-                        task_list.remove(id)
-                        uploaded_id_list.append(id)
-                        logger.info(f'【{total_num - len(task_list)}/{total_num}】 上传成功 {history.src} {cd2_dest}')
+            # 已有上传任务在执行时等待其结束，再处理剩余的队列
+            with upload_lock:
+                self._upload_waiting_list()
+        except Exception as e:
+            logger.error(f"执行上传任务异常: {e}", exc_info=True)
+
+
+    def _upload_immediately(self, ids: List[int]):
+        """
+        非追更剧：批量上传后立即删除本地文件并生成strm
+        """
+        try:
+            logger.info(f'开始执行立即上传任务 转移记录：{ids}')
+            histories = self._load_histories(ids)
+            result = self._upload_batch(ids, histories)
+            self._job_store.remove(result['missing'])
+            self._replace_with_strm([histories[id] for id in result['uploaded']], checkpoint=self._job_store.remove)
+            # 失败的转入待上传队列，随上传任务重试，不再停留在立即上传状态
+            self._job_store.mark_failed(result['failed'], error='上传失败', state=UploadJobStore.WAITING)
+            self._job_store.mark_failed(result['unmapped'], error='没有匹配的路径映射', state=UploadJobStore.WAITING)
+            if result['failed'] and self._queue_dispatcher:
+                self._queue_dispatcher.submit(result['failed'])
+        except Exception as e:
+            logger.error(f"执行立即上传任务异常: {e}", exc_info=True)
+
+    def _upload_waiting_list(self):
+        # 任务表的每次读写都是独立事务，上传过程中仍可继续入队
+        waiting_upload_id_list = self._job_store.list_ids(UploadJobStore.WAITING)
+        if not waiting_upload_id_list:
+            logger.debug('没有需要上传的媒体文件')
+            return
+        logger.info(f'开始执行上传任务 转移记录：{waiting_upload_id_list} ')
+
+        result = self._upload_batch(waiting_upload_id_list, self._load_histories(waiting_upload_id_list))
+        self._job_store.mark_uploaded(result['uploaded'])
+        self._job_store.mark_failed(result['failed'], error='上传失败')
+        self._job_store.remove(result['missing'])
+        self._job_store.mark_failed(result['unmapped'], error='没有匹配的路径映射')
+
+        logger.info(f"本轮上传完成：成功={len(result['uploaded'])}，失败={len(result['failed'])}，"
+                    f"待处理={self._job_store.counts().get(UploadJobStore.WAITING, 0)}")
+        logger.debug(f"待创建Strm记录：{result['uploaded']}")
+
+    def _upload_batch(self, ids: List[int], histories: Dict[int, TransferHistory]) -> Dict[str, List[int]]:
+        """
+        并发上传一批转移记录，同一目标文件夹内按顺序上传
+        :return: uploaded/failed/missing/unmapped 四类ID
+        """
+        result = {'uploaded': [], 'failed': [], 'missing': [], 'unmapped': []}
+        # 按目标文件夹分组，组内保持入队顺序
+        folder_tasks: Dict[str, List[Tuple[int, str, str]]] = {}
+        for id in dict.fromkeys(ids):
+            history: TransferHistory = histories.get(id)
+            if history is None:
+                logger.error(f"{id} 转移记录不存在")
+                result['missing'].append(id)
+                continue
+            # 链接目录前缀 替换为 cd2挂载前缀
+            cd2_dest = self._classifier.to_cloud(history.dest)
+            if not cd2_dest:
+                logger.error(f'{history.dest} 不在任何本地媒体库前缀下，无法上传')
+                result['unmapped'].append(id)
+                continue
+            folder_tasks.setdefault(os.path.dirname(cd2_dest), []).append((id, history.src, cd2_dest))
+
+        total_num = sum(len(tasks) for tasks in folder_tasks.values())
+        progress = {'done': 0}
+        progress_lock = threading.Lock()
+
+        def upload_folder(tasks: List[Tuple[int, str, str]]):
+            for id, src, cd2_dest in tasks:
+                success = self._upload_file(local_source=src, cd2_dest=cd2_dest)
+                with progress_lock:
+                    progress['done'] += 1
+                    if success:
+                        result['uploaded'].append(id)
+                        logger.info(f'【{progress["done"]}/{total_num}】 上传成功 {src} {cd2_dest}')
                     else:
-                        logger.error(f'上传失败 {history.src} {cd2_dest}')
-                        continue
-                logger.info("上传完毕")
+                        result['failed'].append(id)
+                        logger.error(f'【{progress["done"]}/{total_num}】 上传失败 {src} {cd2_dest}')
 
-                task_list = list(dict.fromkeys(task_list))
-                uploaded_id_list = list(dict.fromkeys(uploaded_id_list))
+        if folder_tasks:
+            workers = max(1, min(self._upload_workers, len(folder_tasks)))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cd2strm-upload") as executor:
+                for future in [executor.submit(upload_folder, tasks) for tasks in folder_tasks.values()]:
+                    future.result()
+            logger.info(f"上传完毕：成功={len(result['uploaded'])}，失败={len(result['failed'])}，并发={workers}")
+        return result
 
-                logger.info(f"本轮上传完成：成功={len(uploaded_id_list)}，待处理={len(task_list)}")
-                logger.debug(f"待创建Strm记录：{[self._history_oper.get(i).src for i in uploaded_id_list]}")
+    def _load_histories(self, ids: Iterable[int]) -> Dict[int, TransferHistory]:
+        """
+        一次查询批量加载转移记录，查询失败时退回逐条获取
+        """
+        return self._bulk_load_histories('id', ids, fallback=self._history_oper.get)
 
-                self.save_data(self._data_key_waiting_upload, task_list)
-                self.save_data(self._data_key_uploaded, uploaded_id_list)
-        except Exception as e:
-            logger.error(f"执行上传任务异常: {e}", exc_info=True)
+    def _load_histories_by_src(self, srcs: Iterable[str]) -> Dict[str, TransferHistory]:
+        """
+        按源文件路径批量加载转移记录，同一源文件有多条记录时取最新的一条
+        """
+        return self._bulk_load_histories('src', srcs, fallback=lambda src: self._history_oper.get_by_src(src=src))
 
+    def _bulk_load_histories(self, field: str, keys: Iterable[Any], fallback) -> Dict[Any, TransferHistory]:
+        keys = [key for key in dict.fromkeys(keys) if key is not None]
+        if not keys:
+            return {}
+        histories: Dict[Any, TransferHistory] = {}
+        try:
+            column = getattr(TransferHistory, field)
+            db = get_db()
+            session = next(db) if isinstance(db, types.GeneratorType) else db
+            try:
+                # 分批查询，避免超出 SQLite 参数数量上限
+                for start in range(0, len(keys), 500):
+                    for history in session.query(TransferHistory).filter(
+                            column.in_(keys[start:start + 500])).all():
+                        key = getattr(history, field)
+                        if key not in histories or histories[key].id < history.id:
+                            histories[key] = history
+            finally:
+                if isinstance(db, types.GeneratorType):
+                    db.close()
+        except Exception as err:
+            logger.warning(f"批量查询转移记录失败，改为逐条查询: {err}")
+            for key in keys:
+                history = fallback(key)
+                if history:
+                    histories[key] = history
+        logger.debug(f"加载转移记录：请求={len(keys)}，命中={len(histories)}")
+        return histories
 
     def _upload_file(self, local_source: str = None, cd2_dest: str = None) -> bool:
         try:
             cd2_dest_folder, cd2_dest_file_name = os.path.split(cd2_dest)
 
             if not os.path.exists(cd2_dest_folder):
-                os.makedirs(cd2_dest_folder)
+                # 并发上传时其他线程可能已创建同级父目录
+                os.makedirs(cd2_dest_folder, exist_ok=True)
                 logger.info(f'创建文件夹 {cd2_dest_folder}')
 
             logger.debug(f'源文件路径 {local_source}')
-            if self._cd_mount_prefix_path in local_source:
+            if self._classifier.is_cloud(local_source, check_keywords=False):
                 logger.info(f'源文件 {local_source} 是网盘文件，不上传')
                 return True
 
-            if not os.path.exists(cd2_dest):
-                # 将文件上传到当前文件夹 同步
-                shutil.copy2(local_source, cd2_dest, follow_symlinks=True)
-            else:
-                logger.info(f'{cd2_dest_file_name} 已存在 {cd2_dest}')
+            if os.path.exists(cd2_dest):
+                dest_size = os.path.getsize(cd2_dest)
+                src_size = os.path.getsize(local_source)
+                if dest_size == src_size:
+                    logger.info(f'{cd2_dest_file_name} 已存在 {cd2_dest}')
+                    return True
+                logger.warning(f'{cd2_dest_file_name} 大小不完整（{dest_size}/{src_size}），重新上传')
+                if dest_size < src_size and not os.path.exists(cd2_dest + ChunkedCopier.PART_SUFFIX):
+                    # 旧版本直接写入目标文件留下的半成品，作为临时文件续传
+                    os.replace(cd2_dest, cd2_dest + ChunkedCopier.PART_SUFFIX)
+                else:
+                    os.remove(cd2_dest)
+            # 将文件上传到当前文件夹 同步
+            result = self._copier.copy(local_source, cd2_dest)
+            logger.info(f'{cd2_dest_file_name} 上传完成，{result["bytes"] / 1024 / 1024:.1f}MB，'
+                        f'耗时 {result["elapsed"]:.1f}s，速度 {result["speed"]:.2f}MB/s')
             return True
         except Exception as e:
             logger.error(f"上传文件失败，source={local_source}, dest={cd2_dest}: {e}", exc_info=True)
@@ -263,69 +871,116 @@ class Cd2Strm(_PluginBase):
     def del_dest_create_strm_task(self, now_delete: bool = False):
         with lock:
             try:
-                uploaded_id_list = self.get_data(self._data_key_uploaded) or []
-                temp_list = uploaded_id_list.copy()
-                deleted_count = 0
+                uploaded_id_list = self._job_store.list_ids(UploadJobStore.UPLOADED)
+                histories = self._load_histories(uploaded_id_list)
+                missing_ids = [id for id in uploaded_id_list if id not in histories]
+                if missing_ids:
+                    logger.error(f"{missing_ids} 转移记录不存在")
+                    self._job_store.remove(missing_ids)
+
+                expire_before = datetime.now() - timedelta(days=self._save_days)
+                due_histories = []
                 skipped_count = 0
-                for id in temp_list:
-                    history: TransferHistory = self._history_oper.get(id)
+                for id in uploaded_id_list:
+                    history: TransferHistory = histories.get(id)
                     if history is None:
-                        logger.error(f"{id} 转移记录不存在")
-                        uploaded_id_list.remove(id)
-                        continue
-                    if now_delete:
-                        logger.info(f"立即删除本地媒体文件，创建Strm")
-                        self.del_dest_file(id)
-                        self.create_strm_task(id)
-                        uploaded_id_list.remove(id)
-                        deleted_count += 1
-                        continue
-                    history_date = datetime.strptime(history.date, "%Y-%m-%d %H:%M:%S")
-                    if (datetime.now() - history_date).total_seconds() > self._save_days * 86400:
-                        logger.info(f"{history.dest} 超过 {self._save_days} 天, 开始删除本地媒体文件，创建Strm")
-                        self.del_dest_file(id)
-                        self.create_strm_task(id)
-                        uploaded_id_list.remove(id)
-                        deleted_count += 1
                         continue
-                    else:
-                        skipped_count += 1
-                        logger.debug(f"{history.dest} 整理时间：{history_date}，未过期，跳过")
-                self.save_data(self._data_key_uploaded, uploaded_id_list)
-                # logger.info(f"清理任务完成：删除并生成Strm={deleted_count}，未过期跳过={skipped_count}，剩余待处理={len(uploaded_id_list)}")
+                    if not now_delete:
+                        history_date = datetime.strptime(history.date, "%Y-%m-%d %H:%M:%S")
+                        if history_date > expire_before:
+                            skipped_count += 1
+                            logger.debug(f"{history.dest} 整理时间：{history_date}，未过期，跳过")
+                            continue
+                    due_histories.append(history)
+
+                if due_histories:
+                    logger.info(f"{'立即' if now_delete else f'超过 {self._save_days} 天, '}"
+                                f"删除本地媒体文件并创建Strm，数量={len(due_histories)}")
+                # 每处理完一个目录就从任务表移除，中断后只需处理剩余目录
+                done_ids = self._replace_with_strm(due_histories, checkpoint=self._job_store.remove)
+                logger.info(f"清理任务完成：删除并生成Strm={len(done_ids)}，未过期跳过={skipped_count}，"
+                            f"剩余待处理={self._job_store.counts().get(UploadJobStore.UPLOADED, 0)}")
             except Exception as err:
                 logger.error(f"执行清理并生成Strm任务异常: {err}", exc_info=True)
 
-    def del_dest_file(self, id: int):
-        try:
-            history: TransferHistory = self._history_oper.get(id)
-            os.remove(history.dest)
-            logger.info(f"清除目标文件 {history.dest}")
-        except FileNotFoundError:
-            logger.warning(f"无法删除 {history.dest} 目标文件，目标文件不存在")
-        except OSError as e:
-            logger.error(f"删除 {history.dest} 目标文件失败: {e}")
-
-    def create_strm_task(self, id: int):
-        history: TransferHistory = self._history_oper.get(id)
-        isCloudFile = False
-        if self._cd_mount_prefix_path in history.src:
-            isCloudFile = True
-        # 构造 CloudDrive2 目标路径
-        cd2_dest = ""
-        if isCloudFile:
-            cd2_dest = history.src
-        else:
-            cd2_dest = history.dest.replace(self._local_media_prefix_path, self._cd_mount_prefix_path)
+    def _replace_with_strm(self, histories: List[TransferHistory],
+                           checkpoint: Optional[Callable[[List[int]], Any]] = None) -> List[int]:
+        """
+        按目录分组：先原子写入该目录下所有strm，再删除对应的本地媒体文件，最后记录检查点
+        :return: 已完成的转移记录ID
+        """
+        groups: Dict[str, List[TransferHistory]] = {}
+        for history in histories:
+            groups.setdefault(os.path.dirname(history.dest), []).append(history)
 
-        strm_file_path = os.path.splitext(history.dest)[0] + '.strm'
+        done_ids = []
+        for directory, dir_histories in groups.items():
+            strm_items = []
+            for history in dir_histories:
+                cd2_dest = self._build_strm_target(history)
+                if cd2_dest:
+                    strm_items.append((history, os.path.splitext(history.dest)[0] + '.strm', cd2_dest))
+            written = self._write_strm_files(directory, strm_items)
 
-        try:
-            with open(strm_file_path, "w") as strm_file:
-                strm_file.write(cd2_dest)
-            logger.info(f"生成strm文件 {strm_file_path} <- 写入 {cd2_dest}")
-        except OSError as e:
-            logger.error(f"写入 STRM 文件失败: {e}")
+            dir_done = []
+            removed_count = 0
+            for history in written:
+                try:
+                    os.remove(history.dest)
+                    removed_count += 1
+                except FileNotFoundError:
+                    logger.debug(f"{history.dest} 目标文件不存在，跳过删除")
+                except OSError as e:
+                    # 删除失败的记录不写检查点，下次重试
+                    logger.error(f"删除 {history.dest} 目标文件失败: {e}")
+                    continue
+                dir_done.append(history.id)
+            if checkpoint and dir_done:
+                checkpoint(dir_done)
+            done_ids.extend(dir_done)
+            logger.info(f"{directory}：生成strm {len(written)} 个，清除目标文件 {removed_count} 个")
+        return done_ids
+
+    def _write_strm_files(self, directory: str,
+                          items: List[Tuple[TransferHistory, str, str]]) -> List[TransferHistory]:
+        """
+        先写入临时文件再重命名，保证媒体服务器不会读到写了一半的strm
+        """
+        written = []
+        for history, strm_file_path, cd2_dest in items:
+            tmp_path = f"{strm_file_path}.tmp"
+            try:
+                with open(tmp_path, "w") as strm_file:
+                    strm_file.write(cd2_dest)
+                os.replace(tmp_path, strm_file_path)
+            except OSError as e:
+                logger.error(f"写入 STRM 文件失败: {e}")
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                continue
+            written.append(history)
+            logger.debug(f"生成strm文件 {strm_file_path} <- 写入 {cd2_dest}")
+        if written:
+            try:
+                fd = os.open(directory, os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+            except OSError:
+                pass
+        return written
+
+    def _build_strm_target(self, history: TransferHistory) -> Optional[str]:
+        # 构造 CloudDrive2 目标路径
+        if self._classifier.is_cloud(history.src, check_keywords=False):
+            return history.src
+        cd2_dest = self._classifier.to_cloud(history.dest)
+        if not cd2_dest:
+            logger.error(f'{history.dest} 不在任何本地媒体库前缀下，无法生成strm')
+        return cd2_dest
 
     def get_state(self) -> bool:
         return self._enable
@@ -371,7 +1026,7 @@ class Cd2Strm(_PluginBase):
                                 'component': 'VCol',
                                 'props': {
                                     'cols': 12,
-                                    'md': 6
+                                    'md': 4
                                 },
                                 'content': [
                                     {
@@ -387,7 +1042,7 @@ class Cd2Strm(_PluginBase):
                                 'component': 'VCol',
                                 'props': {
                                     'cols': 12,
-                                    'md': 6
+                                    'md': 4
                                 },
                                 'content': [
                                     {
@@ -399,6 +1054,155 @@ class Cd2Strm(_PluginBase):
                                         }
                                     }
                                 ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'upload_workers',
+                                            'label': '并发上传数',
+                                            'placeholder': '2'
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 6
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'upload_quiet_seconds',
+                                            'label': '非追更剧合并上传等待（秒）',
+                                            'placeholder': '30'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 6
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'upload_batch_size',
+                                            'label': '非追更剧累计数量立即上传',
+                                            'placeholder': '20'
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'copy_chunk_mb',
+                                            'label': '上传分块大小（MB）',
+                                            'placeholder': '8'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSwitch',
+                                        'props': {
+                                            'model': 'verify_hash',
+                                            'label': '上传后校验哈希（需回读网盘文件）',
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSwitch',
+                                        'props': {
+                                            'model': 'zero_copy',
+                                            'label': '零拷贝上传（不支持时自动回退）',
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'upload_rate_limit',
+                                            'label': '上传限速（KB/s，0为不限速）',
+                                            'placeholder': '0'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 8
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'upload_bandwidth_windows',
+                                            'label': '分时段限速',
+                                            'placeholder': '开始小时-结束小时:KB/s，多个用逗号分隔，如 0-7:0,19-23:2048'
+                                        }
+                                    }
+                                ]
                             }
                         ]
                     },
@@ -501,6 +1305,46 @@ class Cd2Strm(_PluginBase):
                             }
                         ]
                     },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 8
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextarea',
+                                        'props': {
+                                            'model': 'path_mappings',
+                                            'label': '额外路径映射',
+                                            'rows': 2,
+                                            'placeholder': '每行一组：本地媒体库前缀#cd2挂载前缀'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'cloud_exclude_keywords',
+                                            'label': '非网盘文件关键词',
+                                            'placeholder': '转存，多个用逗号分隔'
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
                     {
                         'component': 'VRow',
                         'content': [
@@ -530,8 +1374,18 @@ class Cd2Strm(_PluginBase):
             'save_days': self._save_days,
             'onlyonce': self._onlyonce,
             'cleanlocal': self._cleanlocal,
+            'upload_workers': self._upload_workers,
+            'upload_quiet_seconds': self._upload_quiet_seconds,
+            'upload_batch_size': self._upload_batch_size,
+            'copy_chunk_mb': self._copy_chunk_mb,
+            'verify_hash': self._verify_hash,
+            'zero_copy': self._zero_copy,
+            'upload_rate_limit': self._upload_rate_limit,
+            'upload_bandwidth_windows': self._upload_bandwidth_windows,
             'local_media_prefix_path': self._local_media_prefix_path,
-            'cd_mount_prefix_path': self._cd_mount_prefix_path
+            'cd_mount_prefix_path': self._cd_mount_prefix_path,
+            'path_mappings': self._path_mappings,
+            'cloud_exclude_keywords': self._cloud_exclude_keywords
         }
 
     def get_api(self) -> List[Dict[str, Any]]: